@@ -500,9 +500,15 @@ class Network(torch.nn.Module):
     # end
 
     def forward(self, tensorFirst, tensorSecond):
-        tensorFirst = self.moduleExtractor(tensorFirst)  # 6 pyramid levels
-        tensorSecond = self.moduleExtractor(tensorSecond)
+        return self.decode(
+            self.moduleExtractor(tensorFirst),  # 6 pyramid levels
+            self.moduleExtractor(tensorSecond))
 
+    # end
+
+    def decode(self, tensorFirst, tensorSecond):
+        # same as forward but takes the pyramids from moduleExtractor, such
+        # that the pyramid of a fixed reference only has to be computed once
         objectEstimate = self.moduleSix(tensorFirst[-1], tensorSecond[-1],
                                         None)
         objectEstimate = self.moduleFiv(tensorFirst[-2], tensorSecond[-2],
@@ -589,6 +595,130 @@ def estimate(tensorFirst, tensorSecond):
     return tensorOutput
 
 
+def estimate_batch(tensorFirst, tensorSecond, intBatch=8):
+    # tensorFirst / tensorSecond: [N, 3, H, W], returns flows in [N, 2, H, W]
+    assert (tensorFirst.size() == tensorSecond.size())
+
+    intSamples = tensorFirst.size(0)
+    intWidth = tensorFirst.size(3)
+    intHeight = tensorFirst.size(2)
+
+    intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+    intPreprocessedHeight = int(
+        math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+    tensorOutput = torch.FloatTensor(intSamples, 2, intHeight, intWidth)
+
+    for intStart in range(0, intSamples, intBatch):
+        intStop = min(intStart + intBatch, intSamples)
+
+        tensorPreprocessedFirst = torch.nn.functional.interpolate(
+            input=tensorFirst[intStart:intStop].cuda(),
+            size=(intPreprocessedHeight, intPreprocessedWidth),
+            mode='bilinear',
+            align_corners=False)
+        tensorPreprocessedSecond = torch.nn.functional.interpolate(
+            input=tensorSecond[intStart:intStop].cuda(),
+            size=(intPreprocessedHeight, intPreprocessedWidth),
+            mode='bilinear',
+            align_corners=False)
+
+        tensorFlow = 20.0 * torch.nn.functional.interpolate(
+            input=moduleNetwork(tensorPreprocessedFirst,
+                                tensorPreprocessedSecond),
+            size=(intHeight, intWidth),
+            mode='bilinear',
+            align_corners=False)
+
+        tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
+        tensorFlow[:,
+                   1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+
+        tensorOutput[intStart:intStop].copy_(tensorFlow)
+    # end
+
+    return tensorOutput
+
+
+def img2tensor(img):
+    return torch.FloatTensor(
+        img[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) * (1.0 / 255.0))
+
+
+def run_batch(imgs1, imgs2, batch_size=8):
+    # calculate optical flow from each of imgs1 to the corresponding imgs2
+    tensorFirst = torch.stack([img2tensor(img) for img in imgs1], 0)
+    tensorSecond = torch.stack([img2tensor(img) for img in imgs2], 0)
+
+    return estimate_batch(tensorFirst, tensorSecond, intBatch=batch_size)
+
+
+def extract_reference(img_ref):
+    # pyramid of the reference image, to be reused by run_reference
+    tensorRef = img2tensor(img_ref).unsqueeze(0)
+
+    intWidth = tensorRef.size(3)
+    intHeight = tensorRef.size(2)
+
+    intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+    intPreprocessedHeight = int(
+        math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+    tensorPreprocessed = torch.nn.functional.interpolate(
+        input=tensorRef.cuda(),
+        size=(intPreprocessedHeight, intPreprocessedWidth),
+        mode='bilinear',
+        align_corners=False)
+
+    return moduleNetwork.moduleExtractor(tensorPreprocessed)
+
+
+def run_reference(imgs, pyramid_ref, batch_size=8):
+    # calculate optical flow from each of imgs to the reference whose pyramid
+    # has been computed by extract_reference, only imgs run through the
+    # extractor
+    tensorFirst = torch.stack([img2tensor(img) for img in imgs], 0)
+
+    intSamples = tensorFirst.size(0)
+    intWidth = tensorFirst.size(3)
+    intHeight = tensorFirst.size(2)
+
+    intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+    intPreprocessedHeight = int(
+        math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+    tensorOutput = torch.FloatTensor(intSamples, 2, intHeight, intWidth)
+
+    for intStart in range(0, intSamples, batch_size):
+        intStop = min(intStart + batch_size, intSamples)
+
+        tensorPreprocessedFirst = torch.nn.functional.interpolate(
+            input=tensorFirst[intStart:intStop].cuda(),
+            size=(intPreprocessedHeight, intPreprocessedWidth),
+            mode='bilinear',
+            align_corners=False)
+
+        tensorFlow = 20.0 * torch.nn.functional.interpolate(
+            input=moduleNetwork.decode(
+                moduleNetwork.moduleExtractor(tensorPreprocessedFirst), [
+                    tensorLevel.expand(intStop - intStart, -1, -1,
+                                       -1).contiguous()
+                    for tensorLevel in pyramid_ref
+                ]),
+            size=(intHeight, intWidth),
+            mode='bilinear',
+            align_corners=False)
+
+        tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
+        tensorFlow[:,
+                   1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+
+        tensorOutput[intStart:intStop].copy_(tensorFlow)
+    # end
+
+    return tensorOutput
+
+
 def run_once(img1, img2):
     # calculate optical flow from img1 to img2
     tensorFirst = torch.FloatTensor(
@@ -643,18 +773,28 @@ if __name__ == '__main__':
     # img_ref = cv2.resize(
     #     img_ref, (w * 4, h * 4), interpolation=cv2.INTER_CUBIC)
 
+    batch_size = 8
+    pyramid_ref = extract_reference(img_ref)
     img_paths = sorted(glob.glob(os.path.join(data_root, '*')))
+    flow_tensors = []
     for idx, img_path in enumerate(img_paths):
         basename = os.path.splitext(os.path.basename(img_path))[0]
         print(idx, basename)
-        # read image
-        img_input = cv2.imread(img_path)
-        # whether bicubic upsample
-        # h, w, _ = img_input.shape
-        # img_input = cv2.resize(
-        #     img_input, (w * 4, h * 4), interpolation=cv2.INTER_CUBIC)
-        # caulcate flow from img_input (e.g., 049) to img_ref (050)
-        flow_tensor = run_once(img_input, img_ref)  # [2, h, w]
+        if idx % batch_size == 0:
+            # read images of this chunk
+            img_inputs = [
+                cv2.imread(path)
+                for path in img_paths[idx:idx + batch_size]
+            ]
+            # whether bicubic upsample
+            # h, w, _ = img_input.shape
+            # img_input = cv2.resize(
+            #     img_input, (w * 4, h * 4), interpolation=cv2.INTER_CUBIC)
+            # caulcate flow from img_input (e.g., 049) to img_ref (050)
+            flow_tensors = run_reference(
+                img_inputs, pyramid_ref,
+                batch_size=batch_size)  # [n, 2, h, w]
+        flow_tensor = flow_tensors[idx % batch_size].clone()  # [2, h, w]
 
         # downsample flow
         # c, h, w = flow_tensor.size()
@@ -1,10 +1,18 @@
 import torch
 
-import cupy
+import json
+import os
 import re
+import time
+
+try:
+	import cupy
+except:
+	cupy = None # only required for the cuda implementation, the cpu implementation is written in pure pytorch
+# end
 
 class Stream:
-	ptr = torch.cuda.current_stream().cuda_stream
+	ptr = torch.cuda.current_stream().cuda_stream if torch.cuda.is_available() == True else 0
 # end
 
 kernel_Correlation_rearrange = '''
@@ -104,6 +112,110 @@ kernel_Correlation_updateOutput = '''
 	}
 '''
 
+kernel_Correlation_updateOutputNhwc = '''
+	extern "C" __global__ void kernel_Correlation_updateOutputNhwc(
+	  const int n,
+	  const float* first,
+	  const float* second,
+	  float* top
+	) {
+	  extern __shared__ char patch_data_char[];
+	  
+	  float *patch_data = (float *)patch_data_char;
+	  
+	  // same as kernel_Correlation_updateOutput but reads the channels last inputs directly instead of a padded rearrangement, displacements outside of the image contribute zero
+	  int x1 = blockIdx.x;
+	  int y1 = blockIdx.y;
+	  int item = blockIdx.z;
+	  int ch_off = threadIdx.x;
+	  
+	  for (int ch = ch_off; ch < SIZE_1(first); ch += 32) { // CHANNELS
+	    patch_data[ch] = first[((item * SIZE_2(first) + y1) * SIZE_3(first) + x1) * SIZE_1(first) + ch];
+	  }
+	  
+	  __syncthreads();
+	  
+	  __shared__ float sum[32];
+	  
+	  for (int top_channel = 0; top_channel < SIZE_1(top); top_channel++) {
+	    sum[ch_off] = 0;
+	  
+	    int x2 = x1 + top_channel % 9 - 4;
+	    int y2 = y1 + top_channel / 9 - 4;
+	    
+	    if (x2 >= 0 && y2 >= 0 && x2 < SIZE_3(first) && y2 < SIZE_2(first)) {
+	      for (int ch = ch_off; ch < SIZE_1(first); ch += 32) { // CHANNELS
+	        sum[ch_off] += patch_data[ch] * second[((item * SIZE_2(first) + y2) * SIZE_3(first) + x2) * SIZE_1(first) + ch];
+	      }
+	    }
+	    
+	    __syncthreads();
+	    
+	    if (ch_off == 0) {
+	      float total_sum = 0;
+	      for (int idx = 0; idx < 32; idx++) {
+	        total_sum += sum[idx];
+	      }
+	      top[((item * SIZE_2(top) + y1) * SIZE_3(top) + x1) * SIZE_1(top) + top_channel] = total_sum / (float)SIZE_1(first);
+	    }
+	    
+	    __syncthreads();
+	  }
+	}
+'''
+
+kernel_Correlation_updateOutputHorizontal = '''
+	extern "C" __global__ void kernel_Correlation_updateOutputHorizontal(
+	  const int n,
+	  const float* rbot0,
+	  const float* rbot1,
+	  float* top
+	) {
+	  extern __shared__ char patch_data_char[];
+	  
+	  float *patch_data = (float *)patch_data_char;
+	  
+	  // same as kernel_Correlation_updateOutput but only for the 9 horizontal displacements
+	  int x1 = blockIdx.x + 4;
+	  int y1 = blockIdx.y + 4;
+	  int item = blockIdx.z;
+	  int ch_off = threadIdx.x;
+	  
+	  for (int ch = ch_off; ch < SIZE_3(rbot0); ch += 32) { // CHANNELS
+	    int idx1 = ((item * SIZE_1(rbot0) + y1) * SIZE_2(rbot0) + x1) * SIZE_3(rbot0) + ch;
+	    patch_data[ch] = rbot0[idx1];
+	  }
+	  
+	  __syncthreads();
+	  
+	  __shared__ float sum[32];
+	  
+	  for (int top_channel = 0; top_channel < SIZE_1(top); top_channel++) {
+	    sum[ch_off] = 0;
+	  
+	    int s2o = top_channel - 4;
+	    
+	    for (int ch = ch_off; ch < SIZE_3(rbot0); ch += 32) { // CHANNELS
+	      int idx2 = ((item * SIZE_1(rbot0) + y1) * SIZE_2(rbot0) + x1 + s2o) * SIZE_3(rbot0) + ch;
+	      
+	      sum[ch_off] += patch_data[ch] * rbot1[idx2];
+	    }
+	    
+	    __syncthreads();
+	    
+	    if (ch_off == 0) {
+	      float total_sum = 0;
+	      for (int idx = 0; idx < 32; idx++) {
+	        total_sum += sum[idx];
+	      }
+	      const int sumelems = SIZE_3(rbot0);
+	      const int index = ((top_channel*SIZE_2(top) + blockIdx.y)*SIZE_3(top))+blockIdx.x;
+	      top[index + item*SIZE_1(top)*SIZE_2(top)*SIZE_3(top)] = total_sum / (float)sumelems;
+	    }
+	  }
+	}
+'''
+
 kernel_Correlation_updateGradFirst = '''
 	#define ROUND_OFF 50000
 
@@ -272,25 +384,371 @@ def cupy_kernel(strFunction, objectVariables):
 	return strKernel
 # end
 
-@cupy.util.memoize(for_each_device=True)
 def cupy_launch(strFunction, strKernel):
 	return cupy.cuda.compile_with_cache(strKernel).get_function(strFunction)
 # end
 
+if cupy is not None:
+	cupy_launch = cupy.util.memoize(for_each_device=True)(cupy_launch)
+# end
+
+##########################################################
+
+def correlation_buffer(objectBuffers, strName, tensorLike, intSize, boolZero=False):
+	# without objectBuffers this simply allocates, otherwise the buffer is only allocated (and zeroed) once and then reused as long as the size stays the same
+
+	if objectBuffers is None:
+		return tensorLike.new_zeros(intSize) if boolZero == True else tensorLike.new_empty(intSize)
+	# end
+
+	if strName not in objectBuffers or list(objectBuffers[strName].size()) != list(intSize) or objectBuffers[strName].dtype != tensorLike.dtype or objectBuffers[strName].device != tensorLike.device:
+		objectBuffers[strName] = tensorLike.new_zeros(intSize)
+	# end
+
+	return objectBuffers[strName]
+# end
+
+def correlation_pad(tensorSecond, objectBuffers, intPadY=4):
+	if objectBuffers is None:
+		return torch.nn.functional.pad(input=tensorSecond, pad=[ 4, 4, intPadY, intPadY ], mode='constant', value=0.0)
+	# end
+
+	tensorPadded = correlation_buffer(objectBuffers, 'tensorPadded', tensorSecond, [ tensorSecond.size(0), tensorSecond.size(1), tensorSecond.size(2) + (2 * intPadY), tensorSecond.size(3) + 8 ])
+	tensorPadded[:, :, intPadY:intPadY + tensorSecond.size(2), 4:-4] = tensorSecond # the border is never written and hence remains zero
+
+	return tensorPadded
+# end
+
+def correlation_shifted(tensorFirst, tensorSecond, objectBuffers=None):
+	# cpu equivalent of kernel_Correlation_rearrange + kernel_Correlation_updateOutput, instead of iterating over the pixels it iterates over the 81 displacements and lets pytorch vectorize / parallelize each of them
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	tensorPadded = correlation_pad(tensorSecond, objectBuffers)
+	tensorOutput = correlation_buffer(objectBuffers, 'tensorOutput', tensorFirst, [ tensorFirst.size(0), 81, intHeight, intWidth ])
+	tensorProduct = correlation_buffer(objectBuffers, 'tensorProduct', tensorFirst, list(tensorFirst.size()))
+
+	for intY in range(9):
+		for intX in range(9):
+			torch.mul(tensorFirst, tensorPadded[:, :, intY:intY + intHeight, intX:intX + intWidth], out=tensorProduct)
+
+			tensorOutput[:, (intY * 9) + intX, :, :] = tensorProduct.sum(1)
+		# end
+	# end
+
+	return tensorOutput.div_(tensorFirst.size(1))
+# end
+
+def correlation_shifted_backward(tensorFirst, tensorSecond, tensorGradOutput, boolFirst, boolSecond):
+	# cpu equivalent of kernel_Correlation_updateGradFirst and kernel_Correlation_updateGradSecond
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	tensorPadded = torch.nn.functional.pad(input=tensorSecond, pad=[ 4, 4, 4, 4 ], mode='constant', value=0.0)
+	tensorGradFirst = torch.zeros_like(tensorFirst) if boolFirst == True else None
+	tensorGradPadded = torch.zeros_like(tensorPadded) if boolSecond == True else None
+
+	for intY in range(9):
+		for intX in range(9):
+			tensorGrad = tensorGradOutput[:, (intY * 9) + intX, :, :].unsqueeze(1)
+
+			if tensorGradFirst is not None:
+				tensorGradFirst.addcmul_(tensorGrad, tensorPadded[:, :, intY:intY + intHeight, intX:intX + intWidth])
+			# end
+
+			if tensorGradPadded is not None:
+				tensorGradPadded[:, :, intY:intY + intHeight, intX:intX + intWidth].addcmul_(tensorGrad, tensorFirst)
+			# end
+		# end
+	# end
+
+	if tensorGradFirst is not None:
+		tensorGradFirst.div_(tensorFirst.size(1))
+	# end
+
+	if tensorGradPadded is not None:
+		tensorGradPadded = tensorGradPadded[:, :, 4:4 + intHeight, 4:4 + intWidth].div_(tensorFirst.size(1)).contiguous()
+	# end
+
+	return tensorGradFirst, tensorGradPadded
+# end
+
+def correlation_unfold(tensorFirst, tensorSecond, objectBuffers=None):
+	# for each of the 9 vertical displacements, the 9 horizontal ones are exposed as a strided view through unfold and reduced over the channels using einsum
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	tensorPadded = correlation_pad(tensorSecond, objectBuffers)
+	tensorOutput = correlation_buffer(objectBuffers, 'tensorOutput', tensorFirst, [ tensorFirst.size(0), 81, intHeight, intWidth ]).view(tensorFirst.size(0), 9, 9, intHeight, intWidth)
+
+	for intY in range(9):
+		tensorOutput[:, intY, :, :, :] = torch.einsum('nchw,nchwk->nkhw', tensorFirst, tensorPadded[:, :, intY:intY + intHeight, :].unfold(3, 9, 1))
+	# end
+
+	return tensorOutput.view(tensorFirst.size(0), 81, intHeight, intWidth).div_(tensorFirst.size(1))
+# end
+
+def correlation_blocked(tensorFirst, tensorSecond, objectBuffers=None, intBlock=16):
+	# same as correlation_shifted but processed in blocks of rows such that the working set of the 81 displacements stays in the cache
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	tensorPadded = correlation_pad(tensorSecond, objectBuffers)
+	tensorOutput = correlation_buffer(objectBuffers, 'tensorOutput', tensorFirst, [ tensorFirst.size(0), 81, intHeight, intWidth ])
+	tensorProduct = correlation_buffer(objectBuffers, 'tensorBlockProduct', tensorFirst, [ tensorFirst.size(0), tensorFirst.size(1), min(intBlock, intHeight), intWidth ])
+
+	for intStart in range(0, intHeight, intBlock):
+		intStop = min(intStart + intBlock, intHeight)
+
+		tensorBlock = tensorFirst[:, :, intStart:intStop, :]
+		tensorBlockProduct = tensorProduct[:, :, 0:intStop - intStart, :]
+
+		for intY in range(9):
+			for intX in range(9):
+				torch.mul(tensorBlock, tensorPadded[:, :, intStart + intY:intStop + intY, intX:intX + intWidth], out=tensorBlockProduct)
+
+				tensorOutput[:, (intY * 9) + intX, intStart:intStop, :] = tensorBlockProduct.sum(1)
+			# end
+		# end
+	# end
+
+	return tensorOutput.div_(tensorFirst.size(1))
+# end
+
+def correlation_nhwc(tensorFirst, tensorSecond, objectBuffers=None):
+	# consumes channels last inputs without converting them and produces a channels last output, each displacement hence reduces over the innermost dimension
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	tensorFirst = tensorFirst.permute(0, 2, 3, 1) # [N, H, W, C] views of the channels last memory
+	tensorSecond = tensorSecond.permute(0, 2, 3, 1)
+
+	tensorPadded = correlation_buffer(objectBuffers, 'tensorPaddedNhwc', tensorFirst, [ tensorFirst.size(0), intHeight + 8, intWidth + 8, tensorFirst.size(3) ], True)
+	tensorPadded[:, 4:-4, 4:-4, :] = tensorSecond # the border is never written and hence remains zero
+
+	tensorOutput = correlation_buffer(objectBuffers, 'tensorOutputNhwc', tensorFirst, [ tensorFirst.size(0), intHeight, intWidth, 81 ])
+	tensorProduct = correlation_buffer(objectBuffers, 'tensorProductNhwc', tensorFirst, list(tensorFirst.size()))
+
+	for intY in range(9):
+		for intX in range(9):
+			torch.mul(tensorFirst, tensorPadded[:, intY:intY + intHeight, intX:intX + intWidth, :], out=tensorProduct)
+
+			tensorOutput[:, :, :, (intY * 9) + intX] = tensorProduct.sum(3)
+		# end
+	# end
+
+	return tensorOutput.div_(tensorFirst.size(3)).permute(0, 3, 1, 2)
+# end
+
+def correlation_layout(tensorInput):
+	# whether a tensor is channels last without also being contiguous, which is ambiguous for a single channel or pixel
+
+	return tensorInput.is_contiguous() == False and tensorInput.is_contiguous(memory_format=torch.channels_last) == True
+# end
+
+def correlation_horizontal(tensorFirst, tensorSecond, objectBuffers=None):
+	# only the 9 horizontal displacements, which is sufficient for rectified stereo pairs - the output channels correspond to channels 36 to 44 of the full correlation
+
+	intWidth = tensorFirst.size(3)
+
+	tensorPadded = correlation_pad(tensorSecond, objectBuffers, 0)
+	tensorOutput = correlation_buffer(objectBuffers, 'tensorOutput', tensorFirst, [ tensorFirst.size(0), 9, tensorFirst.size(2), intWidth ])
+	tensorProduct = correlation_buffer(objectBuffers, 'tensorProduct', tensorFirst, list(tensorFirst.size()))
+
+	for intX in range(9):
+		torch.mul(tensorFirst, tensorPadded[:, :, :, intX:intX + intWidth], out=tensorProduct)
+
+		tensorOutput[:, intX, :, :] = tensorProduct.sum(1)
+	# end
+
+	return tensorOutput.div_(tensorFirst.size(1))
+# end
+
+def correlation_horizontal_backward(tensorFirst, tensorSecond, tensorGradOutput, boolFirst, boolSecond):
+	intWidth = tensorFirst.size(3)
+
+	tensorPadded = torch.nn.functional.pad(input=tensorSecond, pad=[ 4, 4, 0, 0 ], mode='constant', value=0.0)
+	tensorGradFirst = torch.zeros_like(tensorFirst) if boolFirst == True else None
+	tensorGradPadded = torch.zeros_like(tensorPadded) if boolSecond == True else None
+
+	for intX in range(9):
+		tensorGrad = tensorGradOutput[:, intX, :, :].unsqueeze(1)
+
+		if tensorGradFirst is not None:
+			tensorGradFirst.addcmul_(tensorGrad, tensorPadded[:, :, :, intX:intX + intWidth])
+		# end
+
+		if tensorGradPadded is not None:
+			tensorGradPadded[:, :, :, intX:intX + intWidth].addcmul_(tensorGrad, tensorFirst)
+		# end
+	# end
+
+	if tensorGradFirst is not None:
+		tensorGradFirst.div_(tensorFirst.size(1))
+	# end
+
+	if tensorGradPadded is not None:
+		tensorGradPadded = tensorGradPadded[:, :, :, 4:4 + intWidth].div_(tensorFirst.size(1)).contiguous()
+	# end
+
+	return tensorGradFirst, tensorGradPadded
+# end
+
+##########################################################
+
+Correlation_objectImplementations = {
+	'shifted': correlation_shifted,
+	'unfold': correlation_unfold,
+	'blocked': correlation_blocked
+}
+
+Autotune_boolEnabled = True # set to false to always use correlation_shifted on the cpu
+Autotune_strFile = os.environ.get('PWC_CORRELATION_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'pytorch-pwc', 'correlation.json'))
+Autotune_objectChoices = None
+
+def autotune_signature(tensorFirst):
+	return str.join('-', [ str(tensorFirst.size(0)), str(tensorFirst.size(1)), str(tensorFirst.size(2)), str(tensorFirst.size(3)), str(tensorFirst.dtype).replace('torch.', ''), str(torch.get_num_threads()) ])
+# end
+
+def autotune_load():
+	global Autotune_objectChoices
+
+	if Autotune_objectChoices is None:
+		Autotune_objectChoices = {}
+
+		try:
+			with open(Autotune_strFile, 'r') as objectFile:
+				Autotune_objectChoices = json.load(objectFile)
+			# end
+		except:
+			pass # a missing or corrupted cache simply means that everything gets benchmarked again
+		# end
+	# end
+
+	return Autotune_objectChoices
+# end
+
+def autotune_save():
+	try:
+		os.makedirs(os.path.dirname(os.path.abspath(Autotune_strFile)), exist_ok=True)
+
+		with open(Autotune_strFile + '.tmp', 'w') as objectFile:
+			json.dump(Autotune_objectChoices, objectFile, indent=1, sort_keys=True)
+		# end
+
+		os.replace(Autotune_strFile + '.tmp', Autotune_strFile)
+	except:
+		pass # not being able to persist the choices should not prevent the inference from running
+	# end
+# end
+
+def autotune_benchmark(tensorFirst, tensorSecond, intRepetitions=3):
+	objectTimings = {}
+
+	for strImplementation, functionImplementation in Correlation_objectImplementations.items():
+		functionImplementation(tensorFirst, tensorSecond) # warmup
+
+		dblTimings = []
+
+		for intRepetition in range(intRepetitions):
+			dblStart = time.perf_counter()
+			functionImplementation(tensorFirst, tensorSecond)
+			dblTimings.append(time.perf_counter() - dblStart)
+		# end
+
+		objectTimings[strImplementation] = min(dblTimings)
+	# end
+
+	return objectTimings
+# end
+
+def autotune_select(tensorFirst, tensorSecond):
+	if Autotune_boolEnabled == False:
+		return 'shifted'
+	# end
+
+	objectChoices = autotune_load()
+	strSignature = autotune_signature(tensorFirst)
+
+	if strSignature not in objectChoices or objectChoices[strSignature]['strImplementation'] not in Correlation_objectImplementations:
+		objectTimings = autotune_benchmark(tensorFirst, tensorSecond)
+
+		objectChoices[strSignature] = {
+			'strImplementation': min(objectTimings, key=objectTimings.get),
+			'objectTimings': objectTimings
+		}
+
+		autotune_save()
+	# end
+
+	return objectChoices[strSignature]['strImplementation']
+# end
+
+def autotune_choices():
+	# returns the chosen implementation for every signature in the format batch-channels-height-width-dtype-threads, the channels / resolution identify the decoder level
+
+	return { strSignature: dict(objectChoice) for strSignature, objectChoice in autotune_load().items() }
+# end
+
+def autotune_reset(boolDisk=False):
+	global Autotune_objectChoices
+
+	Autotune_objectChoices = {}
+
+	if boolDisk == True and os.path.isfile(Autotune_strFile) == True:
+		os.remove(Autotune_strFile)
+	# end
+# end
+
+##########################################################
+
 class _FunctionCorrelation(torch.autograd.Function):
 	@staticmethod
-	def forward(self, first, second):
+	def forward(self, first, second, objectBuffers=None):
 		self.save_for_backward(first, second)
 
-		assert(first.is_contiguous() == True)
-		assert(second.is_contiguous() == True)
+		assert(first.is_contiguous() == True or correlation_layout(first) == True)
+		assert(second.is_contiguous() == True or correlation_layout(second) == True)
 
-		self.rbot0 = first.new_zeros([ first.size(0), first.size(2) + 8, first.size(3) + 8, first.size(1) ])
-		self.rbot1 = first.new_zeros([ first.size(0), first.size(2) + 8, first.size(3) + 8, first.size(1) ])
+		if first.is_cuda == True and correlation_layout(first) == True:
+			objectType = first.dtype
 
-		output = first.new_zeros([ first.size(0), 81, first.size(2), first.size(3) ])
+			first = first.float() # the kernel is written for single precision, reduced precisions are hence converted
+			second = second.float().contiguous(memory_format=torch.channels_last)
+
+			output = correlation_buffer(objectBuffers, 'outputNhwc', first, [ first.size(0), first.size(2), first.size(3), 81 ]).permute(0, 3, 1, 2)
+
+			n = output.size(1) * output.size(2) * output.size(3)
+			cupy_launch('kernel_Correlation_updateOutputNhwc', cupy_kernel('kernel_Correlation_updateOutputNhwc', {
+				'first': first,
+				'second': second,
+				'top': output
+			}))(
+				grid=tuple([ first.size(3), first.size(2), first.size(0) ]),
+				block=tuple([ 32, 1, 1 ]),
+				shared_mem=first.size(1) * 4,
+				args=[ n, first.data_ptr(), second.data_ptr(), output.data_ptr() ],
+				stream=Stream
+			)
+
+			output = output.to(objectType)
+
+		elif first.is_cuda == True:
+			objectType = first.dtype
+
+			first = first.float().contiguous() # the kernel is written for single precision, reduced precisions are hence converted while the accumulation happens in single precision either way
+			second = second.float().contiguous()
+
+			self.rbot0 = correlation_buffer(objectBuffers, 'rbot0', first, [ first.size(0), first.size(2) + 8, first.size(3) + 8, first.size(1) ], True)
+			self.rbot1 = correlation_buffer(objectBuffers, 'rbot1', first, [ first.size(0), first.size(2) + 8, first.size(3) + 8, first.size(1) ], True)
+
+			output = correlation_buffer(objectBuffers, 'output', first, [ first.size(0), 81, first.size(2), first.size(3) ])
 
-		if first.is_cuda == True:
 			n = first.size(2) * first.size(3)
 			cupy_launch('kernel_Correlation_rearrange', cupy_kernel('kernel_Correlation_rearrange', {
 				'input': first,
@@ -326,8 +784,13 @@ class _FunctionCorrelation(torch.autograd.Function):
 				stream=Stream
 			)
 
+			output = output.to(objectType)
+
+		elif first.is_cuda == False and correlation_layout(first) == True:
+			output = correlation_nhwc(first, second.contiguous(memory_format=torch.channels_last), objectBuffers)
+
 		elif first.is_cuda == False:
-			raise NotImplementedError()
+			output = Correlation_objectImplementations[autotune_select(first, second.contiguous())](first, second.contiguous(), objectBuffers)
 
 		# end
 
@@ -338,12 +801,12 @@ class _FunctionCorrelation(torch.autograd.Function):
 	def backward(self, gradOutput):
 		first, second = self.saved_tensors
 
-		assert(gradOutput.is_contiguous() == True)
+		gradOutput = gradOutput.contiguous() # the output is channels last if the inputs were
 
-		gradFirst = first.new_zeros([ first.size(0), first.size(1), first.size(2), first.size(3) ]) if self.needs_input_grad[0] == True else None
-		gradSecond = first.new_zeros([ first.size(0), first.size(1), first.size(2), first.size(3) ]) if self.needs_input_grad[1] == True else None
+		if first.is_cuda == True and correlation_layout(first) == False:
+			gradFirst = first.new_zeros([ first.size(0), first.size(1), first.size(2), first.size(3) ]) if self.needs_input_grad[0] == True else None
+			gradSecond = first.new_zeros([ first.size(0), first.size(1), first.size(2), first.size(3) ]) if self.needs_input_grad[1] == True else None
 
-		if first.is_cuda == True:
 			if gradFirst is not None:
 				for intSample in range(first.size(0)):
 					n = first.size(1) * first.size(2) * first.size(3)
@@ -380,17 +843,19 @@ class _FunctionCorrelation(torch.autograd.Function):
 				# end
 			# end
 
-		elif first.is_cuda == False:
-			raise NotImplementedError()
+		elif first.is_cuda == False or correlation_layout(first) == True:
+			gradFirst, gradSecond = correlation_shifted_backward(first, second, gradOutput, self.needs_input_grad[0], self.needs_input_grad[1]) # pure pytorch and hence also used on the gpu for channels last inputs, which are not rearranged in the forward pass
 
 		# end
 
-		return gradFirst, gradSecond
+		return gradFirst, gradSecond, None
 	# end
 # end
 
-def FunctionCorrelation(tensorFirst, tensorSecond):
-	return _FunctionCorrelation.apply(tensorFirst, tensorSecond)
+def FunctionCorrelation(tensorFirst, tensorSecond, objectBuffers=None):
+	# objectBuffers is an optional dictionary in which the intermediate buffers and the output are kept for reuse, the output is hence overwritten by the next call with the same dictionary
+
+	return _FunctionCorrelation.apply(tensorFirst, tensorSecond, objectBuffers)
 # end
 
 class ModuleCorrelation(torch.nn.Module):
@@ -401,4 +866,109 @@ class ModuleCorrelation(torch.nn.Module):
 	def forward(self, tensorFirst, tensorSecond):
 		return _FunctionCorrelation.apply(tensorFirst, tensorSecond)
 	# end
-# end
\ No newline at end of file
+# end
+
+class _FunctionCorrelationHorizontal(torch.autograd.Function):
+	@staticmethod
+	def forward(self, first, second, objectBuffers=None):
+		self.save_for_backward(first, second)
+
+		assert(first.is_contiguous() == True or correlation_layout(first) == True)
+		assert(second.is_contiguous() == True or correlation_layout(second) == True)
+
+		if first.is_cuda == True:
+			objectType = first.dtype
+
+			first = first.float().contiguous() # the kernel is written for single precision and the channels first layout, other inputs are hence converted
+			second = second.float().contiguous()
+
+			rbot0 = correlation_buffer(objectBuffers, 'rbot0', first, [ first.size(0), first.size(2) + 8, first.size(3) + 8, first.size(1) ], True)
+			rbot1 = correlation_buffer(objectBuffers, 'rbot1', first, [ first.size(0), first.size(2) + 8, first.size(3) + 8, first.size(1) ], True)
+
+			output = correlation_buffer(objectBuffers, 'output', first, [ first.size(0), 9, first.size(2), first.size(3) ])
+
+			for tensorInput, tensorRearranged in [ (first, rbot0), (second, rbot1) ]:
+				n = tensorInput.size(2) * tensorInput.size(3)
+				cupy_launch('kernel_Correlation_rearrange', cupy_kernel('kernel_Correlation_rearrange', {
+					'input': tensorInput,
+					'output': tensorRearranged
+				}))(
+					grid=tuple([ int((n + 16 - 1) / 16), tensorInput.size(1), tensorInput.size(0) ]),
+					block=tuple([ 16, 1, 1 ]),
+					args=[ n, tensorInput.data_ptr(), tensorRearranged.data_ptr() ],
+					stream=Stream
+				)
+			# end
+
+			n = output.size(1) * output.size(2) * output.size(3)
+			cupy_launch('kernel_Correlation_updateOutputHorizontal', cupy_kernel('kernel_Correlation_updateOutputHorizontal', {
+				'rbot0': rbot0,
+				'rbot1': rbot1,
+				'top': output
+			}))(
+				grid=tuple([ first.size(3), first.size(2), first.size(0) ]),
+				block=tuple([ 32, 1, 1 ]),
+				shared_mem=first.size(1) * 4,
+				args=[ n, rbot0.data_ptr(), rbot1.data_ptr(), output.data_ptr() ],
+				stream=Stream
+			)
+
+			output = output.to(objectType)
+
+		elif first.is_cuda == False:
+			output = correlation_horizontal(first, second, objectBuffers)
+
+		# end
+
+		return output
+	# end
+
+	@staticmethod
+	def backward(self, gradOutput):
+		first, second = self.saved_tensors
+
+		gradFirst, gradSecond = correlation_horizontal_backward(first, second, gradOutput, self.needs_input_grad[0], self.needs_input_grad[1]) # pure pytorch and hence used on the gpu as well
+
+		return gradFirst, gradSecond, None
+	# end
+# end
+
+def FunctionCorrelationHorizontal(tensorFirst, tensorSecond, objectBuffers=None):
+	return _FunctionCorrelationHorizontal.apply(tensorFirst, tensorSecond, objectBuffers)
+# end
+
+class ModuleCorrelationHorizontal(torch.nn.Module):
+	def __init__(self):
+		super(ModuleCorrelationHorizontal, self).__init__()
+	# end
+
+	def forward(self, tensorFirst, tensorSecond):
+		return _FunctionCorrelationHorizontal.apply(tensorFirst, tensorSecond)
+	# end
+# end
+
+##########################################################
+
+# the correlation as custom operators, which allows torch.jit.script / torch.compile to capture graphs that contain it as an opaque node - there is no autograd formula registered for them since they are meant for inference
+
+if hasattr(torch, 'library') == True and hasattr(torch.library, 'custom_op') == True:
+	@torch.library.custom_op('pwc::correlation', mutates_args=())
+	def correlation_operator(tensorFirst: torch.Tensor, tensorSecond: torch.Tensor) -> torch.Tensor:
+		return _FunctionCorrelation.apply(tensorFirst.contiguous(), tensorSecond.contiguous())
+	# end
+
+	@correlation_operator.register_fake
+	def _(tensorFirst, tensorSecond):
+		return tensorFirst.new_empty([ tensorFirst.size(0), 81, tensorFirst.size(2), tensorFirst.size(3) ])
+	# end
+
+	@torch.library.custom_op('pwc::correlation_horizontal', mutates_args=())
+	def correlation_horizontal_operator(tensorFirst: torch.Tensor, tensorSecond: torch.Tensor) -> torch.Tensor:
+		return _FunctionCorrelationHorizontal.apply(tensorFirst.contiguous(), tensorSecond.contiguous())
+	# end
+
+	@correlation_horizontal_operator.register_fake
+	def _(tensorFirst, tensorSecond):
+		return tensorFirst.new_empty([ tensorFirst.size(0), 9, tensorFirst.size(2), tensorFirst.size(3) ])
+	# end
+# end
@@ -305,42 +305,45 @@ moduleNetwork = Network().cuda().eval()
 ##########################################################
 
 
-def estimate(tensorFirst, tensorSecond):
-    tensorOutput = torch.FloatTensor()
+def estimate_stack(objectInput):
+    # accepts either a [N, 3, H, W] tensor or a list of [3, H, W] tensors / numpy arrays that have been prepared like in __main__
+    if torch.is_tensor(objectInput) == True:
+        return objectInput.float()
+    # end
 
-    assert (tensorFirst.size(1) == tensorSecond.size(1))
-    assert (tensorFirst.size(2) == tensorSecond.size(2))
+    return torch.stack(
+        [torch.as_tensor(objectElement).float() for objectElement in objectInput], 0)
 
-    intWidth = tensorFirst.size(2)
-    intHeight = tensorFirst.size(1)
 
-    # assert (
-    #     intWidth == 1024
-    # )  # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
-    # assert (
-    #     intHeight == 436
-    # )  # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
+# end
 
-    if True:
-        tensorFirst = tensorFirst.cuda()
-        tensorSecond = tensorSecond.cuda()
-        tensorOutput = tensorOutput.cuda()
-    # end
 
-    if True:
-        tensorPreprocessedFirst = tensorFirst.view(1, 3, intHeight, intWidth)
-        tensorPreprocessedSecond = tensorSecond.view(1, 3, intHeight, intWidth)
+def estimate_batch(tensorFirst, tensorSecond, intBatch=8):
+    # tensorFirst / tensorSecond: [N, 3, H, W] or lists of [3, H, W], returns flows in [N, 2, H, W]
+    tensorFirst = estimate_stack(tensorFirst)
+    tensorSecond = estimate_stack(tensorSecond)
+
+    assert (tensorFirst.size() == tensorSecond.size())
 
-        intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
-        intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+    intSamples = tensorFirst.size(0)
+    intWidth = tensorFirst.size(3)
+    intHeight = tensorFirst.size(2)
+
+    intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+    intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+    tensorOutput = torch.FloatTensor(intSamples, 2, intHeight, intWidth)
+
+    for intStart in range(0, intSamples, intBatch):
+        intStop = min(intStart + intBatch, intSamples)
 
         tensorPreprocessedFirst = torch.nn.functional.interpolate(
-            input=tensorPreprocessedFirst,
+            input=tensorFirst[intStart:intStop].cuda(),
             size=(intPreprocessedHeight, intPreprocessedWidth),
             mode='bilinear',
             align_corners=False)
         tensorPreprocessedSecond = torch.nn.functional.interpolate(
-            input=tensorPreprocessedSecond,
+            input=tensorSecond[intStart:intStop].cuda(),
             size=(intPreprocessedHeight, intPreprocessedWidth),
             mode='bilinear',
             align_corners=False)
@@ -354,18 +357,34 @@ def estimate(tensorFirst, tensorSecond):
         tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
         tensorFlow[:, 1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
 
-        tensorOutput.resize_(2, intHeight, intWidth).copy_(tensorFlow[0, :, :, :])
-    # end
-
-    if True:
-        tensorFirst = tensorFirst.cpu()
-        tensorSecond = tensorSecond.cpu()
-        tensorOutput = tensorOutput.cpu()
+        tensorOutput[intStart:intStop].copy_(tensorFlow)
     # end
 
     return tensorOutput
 
 
+# end
+
+
+def estimate(tensorFirst, tensorSecond):
+    assert (tensorFirst.size(1) == tensorSecond.size(1))
+    assert (tensorFirst.size(2) == tensorSecond.size(2))
+
+    intWidth = tensorFirst.size(2)
+    intHeight = tensorFirst.size(1)
+
+    # assert (
+    #     intWidth == 1024
+    # )  # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
+    # assert (
+    #     intHeight == 436
+    # )  # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
+
+    return estimate_batch(
+        tensorFirst.view(1, 3, intHeight, intWidth),
+        tensorSecond.view(1, 3, intHeight, intWidth))[0, :, :, :]
+
+
 # end
 
 ##########################################################
@@ -2,13 +2,27 @@
 
 import torch
 
+import collections
+import copy
+import ctypes
+import gc
 import getopt
+import hashlib
 import math
 import numpy
 import os
 import PIL
 import PIL.Image
 import sys
+import threading
+import time
+import typing
+
+try:
+	import onnxruntime # only required for the onnx backend
+except:
+	onnxruntime = None
+# end
 
 try:
 	from correlation import correlation # the custom cost volume layer
@@ -32,51 +46,250 @@ arguments_strModel = 'default'
 arguments_strFirst = './images/first.png'
 arguments_strSecond = './images/second.png'
 arguments_strOut = './out.flo'
+arguments_strDevice = 'cuda' if torch.cuda.is_available() == True else 'cpu'
+arguments_strDense = 'preallocate'
+arguments_strRelease = 'early'
+arguments_intBudget = 0
+arguments_strGate = 'none'
+arguments_dblGate = 0.5
+arguments_strSparse = 'none'
+arguments_strCache = 'none'
+arguments_strPrecision = 'float32'
+arguments_strBackend = 'eager'
+arguments_strLayout = 'nchw'
 
 for strOption, strArgument in getopt.getopt(sys.argv[1:], '', [ strParameter[2:] + '=' for strParameter in sys.argv[1::2] ])[0]:
 	if strOption == '--model' and strArgument != '': arguments_strModel = strArgument # which model to use
 	if strOption == '--first' and strArgument != '': arguments_strFirst = strArgument # path to the first frame
 	if strOption == '--second' and strArgument != '': arguments_strSecond = strArgument # path to the second frame
 	if strOption == '--out' and strArgument != '': arguments_strOut = strArgument # path to where the output should be stored
+	if strOption == '--device' and strArgument != '': arguments_strDevice = strArgument # device to run on, the correlation layer picks its implementation accordingly
+	if strOption == '--dense' and strArgument != '': arguments_strDense = strArgument # either preallocate or concatenate, how the dense connections in the decoders are formed
+	if strOption == '--release' and strArgument != '': arguments_strRelease = strArgument # either early or late, whether pyramid levels and decoder features are freed as soon as they have been consumed
+	if strOption == '--budget' and strArgument != '': arguments_intBudget = int(strArgument) # memory budget in megabytes, the micro-batch size or tiling are then chosen such that it is not exceeded
+	if strOption == '--gate' and strArgument != '': arguments_strGate = strArgument # either none, pair, or tile, whether the refiner is skipped where the cost volume is confident
+	if strOption == '--confidence' and strArgument != '': arguments_dblGate = float(strArgument) # confidence between zero and one above which the refiner is skipped
+	if strOption == '--sparse' and strArgument != '': arguments_strSparse = strArgument # either none or active, whether the finer levels are only decoded where there is motion
+	if strOption == '--precision' and strArgument != '': arguments_strPrecision = strArgument # either float32, bfloat16, float16, or int8, the type of the weights and of the intermediates like the cost volumes - int8 only applies to the convolutions
+	if strOption == '--backend' and strArgument != '': arguments_strBackend = strArgument # either eager, script, compile, or onnx, whether estimate runs the regular network or the graph-capturable variant as a frozen script / compiled graph / exported onnx model
+	if strOption == '--layout' and strArgument != '': arguments_strLayout = strArgument # either nchw or nhwc, whether the network runs on channels last tensors throughout, including the correlation and the warping
+	if strOption == '--cache' and strArgument != '': arguments_strCache = strArgument # either none or disk, whether estimate looks up previously computed flows by the content of the images
 # end
 
 ##########################################################
 
-Backward_tensorGrid = {}
-Backward_tensorPartial = {}
+Backward_tensorGrid = collections.OrderedDict() # least recently used grids, keyed by height / width / device - the grid is always in single precision since half precisions cannot represent the sampling positions of a typical frame to a fraction of a pixel
+Backward_intCapacity = 32
+Backward_objectStats = { 'intHits': 0, 'intMisses': 0 }
+
+def Backward_grid(intHeight, intWidth, objectDevice):
+	tupleKey = (intHeight, intWidth, str(objectDevice))
+
+	if tupleKey in Backward_tensorGrid:
+		Backward_objectStats['intHits'] += 1
+
+		Backward_tensorGrid.move_to_end(tupleKey)
+
+	elif tupleKey not in Backward_tensorGrid:
+		Backward_objectStats['intMisses'] += 1
+
+		tensorHorizontal = torch.linspace(-1.0, 1.0, intWidth, device=objectDevice, dtype=torch.float32).view(1, 1, intWidth, 1).expand(-1, intHeight, -1, -1)
+		tensorVertical = torch.linspace(-1.0, 1.0, intHeight, device=objectDevice, dtype=torch.float32).view(1, intHeight, 1, 1).expand(-1, -1, intWidth, -1)
+
+		Backward_tensorGrid[tupleKey] = (torch.cat([ tensorHorizontal, tensorVertical ], 3), torch.tensor([ 2.0 / (intWidth - 1.0), 2.0 / (intHeight - 1.0) ], device=objectDevice, dtype=torch.float32))
+
+		while len(Backward_tensorGrid) > Backward_intCapacity:
+			Backward_tensorGrid.popitem(last=False)
+		# end
+
+	# end
+
+	return Backward_tensorGrid[tupleKey]
+# end
+
+def Backward_stats():
+	return dict(Backward_objectStats, intSize=len(Backward_tensorGrid), intCapacity=Backward_intCapacity)
+# end
 
 def Backward(tensorInput, tensorFlow):
-	if str(tensorFlow.size()) not in Backward_tensorGrid:
-		tensorHorizontal = torch.linspace(-1.0, 1.0, tensorFlow.size(3)).view(1, 1, 1, tensorFlow.size(3)).expand(tensorFlow.size(0), -1, tensorFlow.size(2), -1)
-		tensorVertical = torch.linspace(-1.0, 1.0, tensorFlow.size(2)).view(1, 1, tensorFlow.size(2), 1).expand(tensorFlow.size(0), -1, -1, tensorFlow.size(3))
+	if correlation.correlation_layout(tensorInput) == True:
+		return Backward_nhwc(tensorInput, tensorFlow)
+	# end
+
+	intHeight = tensorFlow.size(2)
+	intWidth = tensorFlow.size(3)
+
+	tensorBase, tensorScale = Backward_grid(intHeight, intWidth, tensorFlow.device)
+
+	tensorGrid = torch.addcmul(tensorBase, tensorFlow.float().permute(0, 2, 3, 1), tensorScale) # the [1, H, W, 2] base grid broadcasts over the batch, the sampling and the interpolation are in single precision and only the warped features are cast back
+
+	tensorOutput = torch.nn.functional.grid_sample(input=tensorInput.float(), grid=tensorGrid, mode='bilinear', padding_mode='zeros', align_corners=False)
+
+	# instead of warping an additional channel of ones, the sum of the bilinear weights that fall inside of the input is computed directly from the sampling position
+
+	tensorX = ((tensorGrid[:, :, :, 0] + 1.0) * tensorInput.size(3) - 1.0) / 2.0
+	tensorY = ((tensorGrid[:, :, :, 1] + 1.0) * tensorInput.size(2) - 1.0) / 2.0
+
+	tensorWeightX = (1.0 - torch.relu(-tensorX) - torch.relu(tensorX - (tensorInput.size(3) - 1.0))).clamp_(min=0.0)
+	tensorWeightY = (1.0 - torch.relu(-tensorY) - torch.relu(tensorY - (tensorInput.size(2) - 1.0))).clamp_(min=0.0)
+
+	return (tensorOutput * (tensorWeightX * tensorWeightY > 0.999).unsqueeze(1).to(tensorOutput.dtype)).to(tensorInput.dtype)
+# end
+
+def Backward_nhwc(tensorInput, tensorFlow):
+	# same as Backward but for channels last inputs, grid_sample would return a contiguous output and the bilinear interpolation is hence done by gathering entire pixels from the [N, H * W, C] view of the input
+
+	intSamples = tensorInput.size(0)
+	intChannels = tensorInput.size(1)
+	intHeight = tensorInput.size(2)
+	intWidth = tensorInput.size(3)
+
+	tensorBase, tensorScale = Backward_grid(tensorFlow.size(2), tensorFlow.size(3), tensorFlow.device)
+
+	tensorGrid = torch.addcmul(tensorBase, tensorFlow.float().permute(0, 2, 3, 1), tensorScale).reshape(intSamples, -1, 2)
 
-		Backward_tensorGrid[str(tensorFlow.size())] = torch.cat([ tensorHorizontal, tensorVertical ], 1).cuda()
+	tensorX = ((tensorGrid[:, :, 0:1] + 1.0) * intWidth - 1.0) / 2.0
+	tensorY = ((tensorGrid[:, :, 1:2] + 1.0) * intHeight - 1.0) / 2.0
+
+	tensorWeightX = (1.0 - torch.relu(-tensorX) - torch.relu(tensorX - (intWidth - 1.0))).clamp_(min=0.0)
+	tensorWeightY = (1.0 - torch.relu(-tensorY) - torch.relu(tensorY - (intHeight - 1.0))).clamp_(min=0.0)
+
+	tensorMask = (tensorWeightX * tensorWeightY > 0.999).float()
+
+	tensorLeft = tensorX.floor()
+	tensorTop = tensorY.floor()
+
+	tensorAlpha = tensorX - tensorLeft
+	tensorBeta = tensorY - tensorTop
+
+	tensorLeft = tensorLeft.long()
+	tensorTop = tensorTop.long()
+
+	def valid(tensorIndex, intSize): # neighbors outside of the input are zero, just like the zero padding of grid_sample
+		return ((tensorIndex >= 0) & (tensorIndex < intSize)).float()
+	# end
+
+	tensorWeightLeft = (1.0 - tensorAlpha) * valid(tensorLeft, intWidth)
+	tensorWeightRight = tensorAlpha * valid(tensorLeft + 1, intWidth)
+	tensorWeightTop = (1.0 - tensorBeta) * valid(tensorTop, intHeight) * tensorMask
+	tensorWeightBottom = tensorBeta * valid(tensorTop + 1, intHeight) * tensorMask
+
+	tensorRight = (tensorLeft + 1).clamp_(0, intWidth - 1)
+	tensorBottom = (tensorTop + 1).clamp_(0, intHeight - 1)
+	tensorLeft = tensorLeft.clamp_(0, intWidth - 1)
+	tensorTop = tensorTop.clamp_(0, intHeight - 1)
+
+	tensorPixels = tensorInput.float().permute(0, 2, 3, 1).reshape(intSamples, intHeight * intWidth, intChannels) # a view as long as the input is channels last, the interpolation is in single precision and only the warped features are cast back
+
+	def gather(tensorRow, tensorColumn):
+		return torch.gather(input=tensorPixels, dim=1, index=((tensorRow * intWidth) + tensorColumn).expand(-1, -1, intChannels))
+	# end
+
+	tensorOutput = (tensorWeightTop * tensorWeightLeft) * gather(tensorTop, tensorLeft)
+	tensorOutput.addcmul_(tensorWeightTop * tensorWeightRight, gather(tensorTop, tensorRight))
+	tensorOutput.addcmul_(tensorWeightBottom * tensorWeightLeft, gather(tensorBottom, tensorLeft))
+	tensorOutput.addcmul_(tensorWeightBottom * tensorWeightRight, gather(tensorBottom, tensorRight))
+
+	return tensorOutput.to(tensorInput.dtype).view(intSamples, tensorFlow.size(2), tensorFlow.size(3), intChannels).permute(0, 3, 1, 2)
+# end
+
+Gate_intTile = 32 # size of the tiles at the resolution of the second level, which corresponds to 128 pixels in the input
+Gate_objectStats = { 'intUnits': 0, 'intRefined': 0 }
+
+def gate_confidence(tensorFeat, intVolume=81):
+	# per-pixel confidence of the level two cost volume, which is stored in channels 448 to 448 + intVolume of the decoder features, based on the entropy of its normalized distribution over the displacements
+
+	tensorVolume = tensorFeat[:, 448:448 + intVolume, :, :].float()
+	tensorVolume = (tensorVolume - tensorVolume.mean(1, True)) / (tensorVolume.std(1, keepdim=True) + 0.00001)
+
+	tensorLog = torch.nn.functional.log_softmax(input=tensorVolume, dim=1)
+
+	return 1.0 + ((tensorLog.exp() * tensorLog).sum(1, True) / math.log(float(intVolume)))
+# end
+
+Sparse_intTile = 32 # size of the tiles at the resolution of the second level, needs to be a multiple of four
+Sparse_intContext = 16 # context around each tile at the resolution of the second level, needs to be a multiple of four
+Sparse_dblMotion = 1.0 # tiles with a coarse flow magnitude above this many pixels are active
+Sparse_dblResidual = 0.25 # tiles with a relative warping residual above this are active
+Sparse_dblDense = 0.5 # fraction of active tiles above which the fine levels are decoded densely
+Sparse_objectStats = { 'intTiles': 0, 'intActive': 0 }
+
+def network_adapt(objectState, strCorrelation):
+	# the horizontal variant sees channels 36 to 44 of the full cost volume, the weights that act on the cost volume are hence reduced to these channels - this is an approximation that may benefit from fine-tuning
+
+	if strCorrelation == 'full':
+		return objectState
 	# end
 
-	if str(tensorFlow.size()) not in Backward_tensorPartial:
-		Backward_tensorPartial[str(tensorFlow.size())] = tensorFlow.new_ones([ tensorFlow.size(0), 1, tensorFlow.size(2), tensorFlow.size(3) ])
+	objectState = collections.OrderedDict(objectState)
+	objectOffsets = { 'moduleOne': 0, 'moduleTwo': 128, 'moduleThr': 256, 'moduleFou': 352, 'moduleFiv': 416, 'moduleSix': 448 } # where the cost volume is located within the input of each dense layer of a decoder
+
+	for strKey in list(objectState.keys()):
+		intDim, intOffset = None, None
+
+		if strKey.endswith('.moduleUpfeat.weight') == True:
+			intDim, intOffset = 0, 448 # transposed convolution, which is why the input channels are in the first dimension
+
+		elif strKey.startswith('moduleRefiner.moduleMain.0.') == True and strKey.endswith('.weight') == True:
+			intDim, intOffset = 1, 448
+
+		elif strKey.split('.')[0] != 'moduleExtractor' and strKey.split('.')[1] in objectOffsets and strKey.endswith('.weight') == True:
+			intDim, intOffset = 1, objectOffsets[strKey.split('.')[1]]
+
+		# end
+
+		if intDim is not None:
+			tensorWeight = objectState[strKey]
+
+			objectState[strKey] = torch.cat([ tensorWeight.narrow(intDim, 0, intOffset), tensorWeight.narrow(intDim, intOffset + 36, 9), tensorWeight.narrow(intDim, intOffset + 81, tensorWeight.size(intDim) - intOffset - 81) ], intDim).contiguous()
+		# end
 	# end
 
-	tensorFlow = torch.cat([ tensorFlow[:, 0:1, :, :] / ((tensorInput.size(3) - 1.0) / 2.0), tensorFlow[:, 1:2, :, :] / ((tensorInput.size(2) - 1.0) / 2.0) ], 1)
-	tensorInput = torch.cat([ tensorInput, Backward_tensorPartial[str(tensorFlow.size())] ], 1)
+	return objectState
+# end
+
+class QuantizedConvolution(torch.nn.Module):
+	# wraps a convolution such that it can be statically quantized while its input and output remain in floating point, the correlation and the warping hence stay unchanged
+
+	def __init__(self, moduleConv):
+		super(QuantizedConvolution, self).__init__()
 
-	tensorOutput = torch.nn.functional.grid_sample(input=tensorInput, grid=(Backward_tensorGrid[str(tensorFlow.size())] + tensorFlow).permute(0, 2, 3, 1), mode='bilinear', padding_mode='zeros')
+		self.moduleQuant = torch.ao.quantization.QuantStub()
+		self.moduleConv = moduleConv
+		self.moduleDequant = torch.ao.quantization.DeQuantStub()
 
-	tensorMask = tensorOutput[:, -1:, :, :]; tensorMask[tensorMask > 0.999] = 1.0; tensorMask[tensorMask < 1.0] = 0.0
+		self.in_channels = moduleConv.in_channels
+		self.out_channels = moduleConv.out_channels
+	# end
+
+	@property
+	def weight(self):
+		# the quantized convolution only exposes its weight through a method
+
+		return self.moduleConv.weight().dequantize() if callable(self.moduleConv.weight) == True else self.moduleConv.weight
+	# end
 
-	return tensorOutput[:, :-1, :, :] * tensorMask
+	def forward(self, tensorInput):
+		return self.moduleDequant(self.moduleConv(self.moduleQuant(tensorInput))).contiguous(memory_format=torch.channels_last if correlation.correlation_layout(tensorInput) == True else torch.contiguous_format) # the quantized convolution returns the channels last memory format, which is only kept if the input was channels last as well
+	# end
 # end
 
 ##########################################################
 
 class Network(torch.nn.Module):
-	def __init__(self):
+	def __init__(self, strCorrelation='full'):
 		super(Network, self).__init__()
 
+		intVolume = { 'full': 81, 'horizontal': 9 }[strCorrelation] # horizontal only searches along the x axis, which suffices for rectified stereo pairs
+
+		self.intVolume = intVolume
+
 		class Extractor(torch.nn.Module):
 			def __init__(self):
 				super(Extractor, self).__init__()
 
+				self.boolChannelsLast = arguments_strLayout == 'nhwc' # an attribute instead of reading the global in forward, which keeps the extractor scriptable
+
 				self.moduleOne = torch.nn.Sequential(
 					torch.nn.Conv2d(in_channels=3, out_channels=16, kernel_size=3, stride=2, padding=1),
 					torch.nn.LeakyReLU(inplace=False, negative_slope=0.1),
@@ -133,6 +346,12 @@ class Network(torch.nn.Module):
 			# end
 
 			def forward(self, tensorInput):
+				tensorInput = tensorInput.to(self.moduleOne[0].weight.dtype) # the network may run in reduced precision, in which case the pyramids are of the same type as the weights
+
+				if self.boolChannelsLast == True:
+					tensorInput = tensorInput.contiguous(memory_format=torch.channels_last) # the only conversion, every layer afterwards consumes and produces channels last tensors
+				# end
+
 				tensorOne = self.moduleOne(tensorInput)
 				tensorTwo = self.moduleTwo(tensorOne)
 				tensorThr = self.moduleThr(tensorTwo)
@@ -148,8 +367,11 @@ class Network(torch.nn.Module):
 			def __init__(self, intLevel):
 				super(Decoder, self).__init__()
 
-				intPrevious = [ None, None, 81 + 32 + 2 + 2, 81 + 64 + 2 + 2, 81 + 96 + 2 + 2, 81 + 128 + 2 + 2, 81, None ][intLevel + 1]
-				intCurrent = [ None, None, 81 + 32 + 2 + 2, 81 + 64 + 2 + 2, 81 + 96 + 2 + 2, 81 + 128 + 2 + 2, 81, None ][intLevel + 0]
+				intPrevious = [ None, None, intVolume + 32 + 2 + 2, intVolume + 64 + 2 + 2, intVolume + 96 + 2 + 2, intVolume + 128 + 2 + 2, intVolume, None ][intLevel + 1]
+				intCurrent = [ None, None, intVolume + 32 + 2 + 2, intVolume + 64 + 2 + 2, intVolume + 96 + 2 + 2, intVolume + 128 + 2 + 2, intVolume, None ][intLevel + 0]
+
+				self.intVolume = intVolume
+				self.functionCorrelation = { 81: correlation.FunctionCorrelation, 9: correlation.FunctionCorrelationHorizontal }[intVolume]
 
 				if intLevel < 6: self.moduleUpflow = torch.nn.ConvTranspose2d(in_channels=2, out_channels=2, kernel_size=4, stride=2, padding=1)
 				if intLevel < 6: self.moduleUpfeat = torch.nn.ConvTranspose2d(in_channels=intPrevious + 128 + 128 + 96 + 64 + 32, out_channels=2, kernel_size=4, stride=2, padding=1)
@@ -185,7 +407,11 @@ class Network(torch.nn.Module):
 				)
 			# end
 
-			def forward(self, tensorFirst, tensorSecond, objectPrevious):
+			def forward(self, tensorFirst, tensorSecond, objectPrevious, objectBuffers=None):
+				if arguments_strDense == 'preallocate' and arguments_strLayout != 'nhwc': # the channel slices of a preallocated channels last buffer are strided and would be converted by every convolution
+					return self.forward_preallocate(tensorFirst, tensorSecond, objectPrevious, objectBuffers)
+				# end
+
 				tensorFlow = None
 				tensorFeat = None
 
@@ -193,15 +419,19 @@ class Network(torch.nn.Module):
 					tensorFlow = None
 					tensorFeat = None
 
-					tensorVolume = torch.nn.functional.leaky_relu(input=correlation.FunctionCorrelation(tensorFirst=tensorFirst, tensorSecond=tensorSecond), negative_slope=0.1, inplace=False)
+					tensorVolume = torch.nn.functional.leaky_relu(input=self.functionCorrelation(tensorFirst=tensorFirst, tensorSecond=tensorSecond, objectBuffers=objectBuffers), negative_slope=0.1, inplace=False)
 
 					tensorFeat = torch.cat([ tensorVolume ], 1)
 
 				elif objectPrevious is not None:
 					tensorFlow = self.moduleUpflow(objectPrevious['tensorFlow'])
-					tensorFeat = self.moduleUpfeat(objectPrevious['tensorFeat'])
+					tensorFeat = self.moduleUpfeat(objectPrevious['tensorFeat']) if objectPrevious['tensorFeat'] is not None else tensorFlow.new_zeros([ tensorFlow.size(0), 2, tensorFlow.size(2), tensorFlow.size(3) ]) # there are no features if the flow stems from a warm start
 
-					tensorVolume = torch.nn.functional.leaky_relu(input=correlation.FunctionCorrelation(tensorFirst=tensorFirst, tensorSecond=Backward(tensorInput=tensorSecond, tensorFlow=tensorFlow * self.dblBackward)), negative_slope=0.1, inplace=False)
+					if arguments_strRelease == 'early':
+						objectPrevious['tensorFeat'] = None # the features of the previous level are no longer needed once they have been upsampled
+					# end
+
+					tensorVolume = torch.nn.functional.leaky_relu(input=self.functionCorrelation(tensorFirst=tensorFirst, tensorSecond=Backward(tensorInput=tensorSecond, tensorFlow=tensorFlow * self.dblBackward), objectBuffers=objectBuffers), negative_slope=0.1, inplace=False)
 
 					tensorFeat = torch.cat([ tensorVolume, tensorFirst, tensorFlow, tensorFeat ], 1)
 
@@ -220,6 +450,56 @@ class Network(torch.nn.Module):
 					'tensorFeat': tensorFeat
 				}
 			# end
+
+			def forward_preallocate(self, tensorFirst, tensorSecond, objectPrevious, objectBuffers=None):
+				# same as forward but the dense connections write into slices of a single buffer instead of repeatedly concatenating, the channel order matches the concatenation such that the weights remain valid
+
+				tensorFlow = None
+				tensorFeat = correlation.correlation_buffer(objectBuffers, 'tensorFeat', tensorFirst, [ tensorFirst.size(0), self.moduleSix[0].in_channels, tensorFirst.size(2), tensorFirst.size(3) ])
+
+				intOffset = 128 + 128 + 96 + 64 + 32
+
+				if objectPrevious is None:
+					tensorFeat[:, intOffset:intOffset + self.intVolume, :, :] = torch.nn.functional.leaky_relu(input=self.functionCorrelation(tensorFirst=tensorFirst, tensorSecond=tensorSecond, objectBuffers=objectBuffers), negative_slope=0.1, inplace=True)
+
+				elif objectPrevious is not None:
+					tensorFlow = self.moduleUpflow(objectPrevious['tensorFlow'])
+
+					if objectPrevious['tensorFeat'] is not None:
+						tensorFeat[:, intOffset + self.intVolume + 2 + tensorFirst.size(1):, :, :] = self.moduleUpfeat(objectPrevious['tensorFeat'])
+
+					elif objectPrevious['tensorFeat'] is None:
+						tensorFeat[:, intOffset + self.intVolume + 2 + tensorFirst.size(1):, :, :] = 0.0 # there are no features if the flow stems from a warm start
+
+					# end
+
+					if arguments_strRelease == 'early':
+						objectPrevious['tensorFeat'] = None # the features of the previous level are no longer needed once they have been upsampled
+					# end
+
+					tensorFeat[:, intOffset:intOffset + self.intVolume, :, :] = torch.nn.functional.leaky_relu(input=self.functionCorrelation(tensorFirst=tensorFirst, tensorSecond=Backward(tensorInput=tensorSecond, tensorFlow=tensorFlow * self.dblBackward), objectBuffers=objectBuffers), negative_slope=0.1, inplace=True)
+					tensorFeat[:, intOffset + self.intVolume:intOffset + self.intVolume + tensorFirst.size(1), :, :] = tensorFirst
+					tensorFeat[:, intOffset + self.intVolume + tensorFirst.size(1):intOffset + self.intVolume + 2 + tensorFirst.size(1), :, :] = tensorFlow
+
+				# end
+
+				for moduleDense in [ self.moduleOne, self.moduleTwo, self.moduleThr, self.moduleFou, self.moduleFiv ]:
+					intChannels = moduleDense[0].out_channels
+
+					for intSample in range(tensorFeat.size(0)): # the channel slice of the entire batch is strided and would be copied by the convolution, the slice of a single sample is contiguous
+						tensorFeat[intSample:intSample + 1, intOffset - intChannels:intOffset, :, :] = torch.nn.functional.leaky_relu(input=moduleDense[0](tensorFeat[intSample:intSample + 1, intOffset:, :, :]), negative_slope=0.1, inplace=True)
+					# end
+
+					intOffset -= intChannels
+				# end
+
+				tensorFlow = self.moduleSix(tensorFeat)
+
+				return {
+					'tensorFlow': tensorFlow,
+					'tensorFeat': tensorFeat
+				}
+			# end
 		# end
 
 		class Refiner(torch.nn.Module):
@@ -227,7 +507,7 @@ class Network(torch.nn.Module):
 				super(Refiner, self).__init__()
 
 				self.moduleMain = torch.nn.Sequential(
-					torch.nn.Conv2d(in_channels=81 + 32 + 2 + 2 + 128 + 128 + 96 + 64 + 32, out_channels=128, kernel_size=3, stride=1, padding=1, dilation=1),
+					torch.nn.Conv2d(in_channels=intVolume + 32 + 2 + 2 + 128 + 128 + 96 + 64 + 32, out_channels=128, kernel_size=3, stride=1, padding=1, dilation=1),
 					torch.nn.LeakyReLU(inplace=False, negative_slope=0.1),
 					torch.nn.Conv2d(in_channels=128, out_channels=128, kernel_size=3, stride=1, padding=2, dilation=2),
 					torch.nn.LeakyReLU(inplace=False, negative_slope=0.1),
@@ -258,77 +538,1915 @@ class Network(torch.nn.Module):
 
 		self.moduleRefiner = Refiner()
 
-		self.load_state_dict(torch.load('./network-' + arguments_strModel + '.pytorch'))
+		self.load_state_dict(network_adapt(torch.load('./network-' + arguments_strModel + '.pytorch', map_location='cpu'), strCorrelation))
+	# end
+
+	def forward(self, tensorFirst, tensorSecond, objectBuffers=None, intLevel=2, boolRefiner=True):
+		# intLevel allows to stop decoding early, the refiner only applies to the second level
+
+		return self.decode(self.moduleExtractor(tensorFirst), self.moduleExtractor(tensorSecond), objectBuffers, intLevel, boolRefiner)
+	# end
+
+	def decode(self, tensorFirst, tensorSecond, objectBuffers=None, intLevel=2, boolRefiner=True, objectPrevious=None, intStart=6):
+		# same as forward but takes the feature pyramids from moduleExtractor, such that pyramids can be shared - the given lists are not modified, objectPrevious and intStart allow to skip the decoders above intStart by providing the estimate of the level above it
+
+		tensorFirst = list(tensorFirst)
+		tensorSecond = list(tensorSecond)
+
+		if objectBuffers is None:
+			objectBuffers = collections.defaultdict(lambda: None)
+		# end
+
+		if arguments_strRelease == 'early':
+			tensorFirst[0] = None # the first level of the pyramid is not used by any of the decoders
+			tensorSecond[0] = None
+		# end
+
+		objectEstimate = objectPrevious
+
+		if objectEstimate is not None:
+			objectEstimate = { 'tensorFlow': objectEstimate['tensorFlow'].to(self.moduleTwo.moduleUpflow.weight.dtype), 'tensorFeat': objectEstimate['tensorFeat'] }
+		# end
+
+		for intDecoder, strDecoder in [ (6, 'moduleSix'), (5, 'moduleFiv'), (4, 'moduleFou'), (3, 'moduleThr'), (2, 'moduleTwo') ]:
+			if intDecoder > intStart:
+				continue
+			# end
+
+			if intDecoder < intLevel:
+				break
+			# end
+
+			objectEstimate = getattr(self, strDecoder)(tensorFirst[intDecoder - 1], tensorSecond[intDecoder - 1], objectEstimate, objectBuffers[strDecoder])
+
+			if intDecoder == 4 and intLevel == 2 and arguments_strSparse == 'active':
+				return self.forward_sparse(tensorFirst, tensorSecond, objectEstimate, boolRefiner).float()
+			# end
+
+			if arguments_strRelease == 'early':
+				tensorFirst[intDecoder - 1] = None
+				tensorSecond[intDecoder - 1] = None
+			# end
+		# end
+
+		if intLevel != 2 or boolRefiner == False:
+			return objectEstimate['tensorFlow'].float()
+		# end
+
+		return self.refine(objectEstimate['tensorFlow'], objectEstimate['tensorFeat']).float() # the flow is always returned in single precision such that its scaling is not subject to rounding
+	# end
+
+	def forward_sparse(self, tensorFirst, tensorSecond, objectEstimate, boolRefiner):
+		# decodes the third and second level only on tiles that are active according to the flow and the warping residual of the fourth level, all other tiles are filled with the upsampled flow of the fourth level
+
+		intTile = Sparse_intTile
+		intContext = Sparse_intContext
+
+		intHeight = tensorFirst[1].size(2)
+		intWidth = tensorFirst[1].size(3)
+
+		tensorResidual = (tensorFirst[3] - Backward(tensorInput=tensorSecond[3], tensorFlow=objectEstimate['tensorFlow'] * 1.25)).abs().mean(1, True) / (tensorFirst[3].abs().mean([ 1, 2, 3 ], True) + 0.00001)
+		tensorActive = ((objectEstimate['tensorFlow'].pow(2.0).sum(1, True).sqrt() * 20.0) > Sparse_dblMotion) | (tensorResidual > Sparse_dblResidual)
+		tensorActive = torch.nn.functional.max_pool2d(input=tensorActive.float(), kernel_size=intTile // 4, stride=intTile // 4, ceil_mode=True) > 0.5
+
+		Sparse_objectStats['intTiles'] += tensorActive.numel()
+		Sparse_objectStats['intActive'] += int(tensorActive.sum().item())
+
+		if tensorActive.float().mean().item() > Sparse_dblDense:
+			objectEstimate = self.moduleThr(tensorFirst[2], tensorSecond[2], objectEstimate)
+			objectEstimate = self.moduleTwo(tensorFirst[1], tensorSecond[1], objectEstimate)
+
+			return self.refine(objectEstimate['tensorFlow'], objectEstimate['tensorFeat']) if boolRefiner == True else objectEstimate['tensorFlow']
+		# end
+
+		tensorOutput = torch.nn.functional.interpolate(input=objectEstimate['tensorFlow'], size=(intHeight, intWidth), mode='bilinear', align_corners=False)
+
+		objectGroups = collections.defaultdict(list) # crops at the image border are smaller, tiles are hence batched by the geometry of their crop
+
+		for intSample, intZero, intY, intX in tensorActive.nonzero().tolist():
+			intTop = intY * intTile
+			intLeft = intX * intTile
+			intBottom = min(intTop + intTile, intHeight)
+			intRight = min(intLeft + intTile, intWidth)
+
+			intCropTop = max(intTop - intContext, 0)
+			intCropLeft = max(intLeft - intContext, 0)
+			intCropBottom = min(intBottom + intContext, intHeight)
+			intCropRight = min(intRight + intContext, intWidth)
+
+			objectGroups[(intCropBottom - intCropTop, intCropRight - intCropLeft, intTop - intCropTop, intLeft - intCropLeft, intBottom - intTop, intRight - intLeft)].append((intSample, intCropTop, intCropLeft))
+		# end
+
+		for (intCropHeight, intCropWidth, intOffsetY, intOffsetX, intTileHeight, intTileWidth), objectCrops in objectGroups.items():
+			# the tile and context sizes are multiples of four, which is why every crop maps to whole pixels on the third and fourth level
+
+			def crop(tensorInput, intScale):
+				return torch.stack([ tensorInput[intSample, :, (intCropTop // intScale):(intCropTop + intCropHeight) // intScale, (intCropLeft // intScale):(intCropLeft + intCropWidth) // intScale] for intSample, intCropTop, intCropLeft in objectCrops ], 0)
+			# end
+
+			objectCrop = { 'tensorFlow': crop(objectEstimate['tensorFlow'], 4), 'tensorFeat': crop(objectEstimate['tensorFeat'], 4) }
+			objectCrop = self.moduleThr(crop(tensorFirst[2], 2), crop(tensorSecond[2], 2), objectCrop)
+			objectCrop = self.moduleTwo(crop(tensorFirst[1], 1), crop(tensorSecond[1], 1), objectCrop)
+
+			tensorFlow = self.refine(objectCrop['tensorFlow'], objectCrop['tensorFeat']) if boolRefiner == True else objectCrop['tensorFlow']
+
+			for intCrop, (intSample, intCropTop, intCropLeft) in enumerate(objectCrops):
+				tensorOutput[intSample, :, intCropTop + intOffsetY:intCropTop + intOffsetY + intTileHeight, intCropLeft + intOffsetX:intCropLeft + intOffsetX + intTileWidth] = tensorFlow[intCrop, :, intOffsetY:intOffsetY + intTileHeight, intOffsetX:intOffsetX + intTileWidth]
+			# end
+		# end
+
+		return tensorOutput
 	# end
 
-	def forward(self, tensorFirst, tensorSecond):
-		tensorFirst = self.moduleExtractor(tensorFirst)
-		tensorSecond = self.moduleExtractor(tensorSecond)
+	def refine(self, tensorFlow, tensorFeat):
+		# applies the refiner either everywhere, or gated by the confidence of the cost volume per pair / per tile
+
+		if arguments_strGate == 'none':
+			return tensorFlow + self.moduleRefiner(tensorFeat)
+		# end
+
+		tensorConfidence = gate_confidence(tensorFeat, self.intVolume)
+
+		tensorOutput = tensorFlow.clone()
+
+		if arguments_strGate == 'pair':
+			tensorRefine = tensorConfidence.mean([ 1, 2, 3 ]) < arguments_dblGate
+
+			Gate_objectStats['intUnits'] += tensorRefine.numel()
+			Gate_objectStats['intRefined'] += int(tensorRefine.sum().item())
+
+			if tensorRefine.any() == True:
+				tensorOutput[tensorRefine] += self.moduleRefiner(tensorFeat[tensorRefine])
+			# end
+
+		elif arguments_strGate == 'tile':
+			intTile = Gate_intTile
+			intContext = 33 # the receptive field of the refiner, such that the center of each crop is identical to the dense result
+
+			intHeight = tensorFeat.size(2)
+			intWidth = tensorFeat.size(3)
+
+			tensorRefine = torch.nn.functional.avg_pool2d(input=tensorConfidence, kernel_size=intTile, stride=intTile, ceil_mode=True) < arguments_dblGate
+
+			Gate_objectStats['intUnits'] += tensorRefine.numel()
+			Gate_objectStats['intRefined'] += int(tensorRefine.sum().item())
+
+			objectGroups = collections.defaultdict(list) # crops at the image border are smaller, tiles are hence batched by the geometry of their crop
+
+			for intSample in range(tensorRefine.size(0)):
+				objectCrops = []
+
+				for intZero, intY, intX in tensorRefine[intSample].nonzero().tolist():
+					intTop = intY * intTile
+					intLeft = intX * intTile
+					intBottom = min(intTop + intTile, intHeight)
+					intRight = min(intLeft + intTile, intWidth)
 
-		objectEstimate = self.moduleSix(tensorFirst[-1], tensorSecond[-1], None)
-		objectEstimate = self.moduleFiv(tensorFirst[-2], tensorSecond[-2], objectEstimate)
-		objectEstimate = self.moduleFou(tensorFirst[-3], tensorSecond[-3], objectEstimate)
-		objectEstimate = self.moduleThr(tensorFirst[-4], tensorSecond[-4], objectEstimate)
-		objectEstimate = self.moduleTwo(tensorFirst[-5], tensorSecond[-5], objectEstimate)
+					intCropTop = max(intTop - intContext, 0)
+					intCropLeft = max(intLeft - intContext, 0)
+					intCropBottom = min(intBottom + intContext, intHeight)
+					intCropRight = min(intRight + intContext, intWidth)
 
-		return objectEstimate['tensorFlow'] + self.moduleRefiner(objectEstimate['tensorFeat'])
+					objectCrops.append(((intCropBottom - intCropTop, intCropRight - intCropLeft, intTop - intCropTop, intLeft - intCropLeft, intBottom - intTop, intRight - intLeft), (intSample, intCropTop, intCropLeft)))
+				# end
+
+				if sum([ objectCrop[0][0] * objectCrop[0][1] for objectCrop in objectCrops ]) >= intHeight * intWidth:
+					objectCrops = [ ((intHeight, intWidth, 0, 0, intHeight, intWidth), (intSample, 0, 0)) ] # refining the crops would be more expensive than refining the entire sample
+				# end
+
+				for objectGeometry, objectCrop in objectCrops:
+					objectGroups[objectGeometry].append(objectCrop)
+				# end
+			# end
+
+			for (intCropHeight, intCropWidth, intOffsetY, intOffsetX, intTileHeight, intTileWidth), objectCrops in objectGroups.items():
+				tensorResidual = self.moduleRefiner(torch.stack([ tensorFeat[intSample, :, intCropTop:intCropTop + intCropHeight, intCropLeft:intCropLeft + intCropWidth] for intSample, intCropTop, intCropLeft in objectCrops ], 0))
+
+				for intCrop, (intSample, intCropTop, intCropLeft) in enumerate(objectCrops):
+					tensorOutput[intSample, :, intCropTop + intOffsetY:intCropTop + intOffsetY + intTileHeight, intCropLeft + intOffsetX:intCropLeft + intOffsetX + intTileWidth] += tensorResidual[intCrop, :, intOffsetY:intOffsetY + intTileHeight, intOffsetX:intOffsetX + intTileWidth]
+				# end
+			# end
+
+		# end
+
+		return tensorOutput
 	# end
 # end
 
-moduleNetwork = Network().cuda().eval()
+Checkpoint_objectIdentities = {}
 
-##########################################################
+def checkpoint_identity(strFile):
+	# content hash of a checkpoint, which is only computed once as long as the size and the modification time of the file stay the same
 
-def estimate(tensorFirst, tensorSecond):
-	tensorOutput = torch.FloatTensor()
+	tupleKey = (os.path.abspath(strFile), os.path.getsize(strFile), os.path.getmtime(strFile))
 
-	assert(tensorFirst.size(1) == tensorSecond.size(1))
-	assert(tensorFirst.size(2) == tensorSecond.size(2))
+	if tupleKey not in Checkpoint_objectIdentities:
+		Checkpoint_objectIdentities[tupleKey] = hashlib.sha1(open(strFile, 'rb').read()).hexdigest()
+	# end
 
-	intWidth = tensorFirst.size(2)
-	intHeight = tensorFirst.size(1)
+	return Checkpoint_objectIdentities[tupleKey]
+# end
 
-	assert(intWidth == 1024) # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
-	assert(intHeight == 436) # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
+Precision_objectTypes = { 'float32': torch.float32, 'bfloat16': torch.bfloat16, 'float16': torch.float16 }
+Precision_dblTolerance = 0.1 # average endpoint error against single precision below which a reduced precision is considered safe to use
+
+Quantize_strFile = './network-' + arguments_strModel + '-int8.pytorch'
+
+def quantize_network(moduleNetwork, objectPairs=[]):
+	# static post-training quantization of all plain convolutions, the transposed convolutions remain in floating point - the network is calibrated on the given pairs of [N, 3, H, W] tensors, without any pairs it only gets the structure that is necessary to load a quantized checkpoint
 
-	if True:
-		tensorFirst = tensorFirst.cuda()
-		tensorSecond = tensorSecond.cuda()
-		tensorOutput = tensorOutput.cuda()
+	for moduleParent in list(moduleNetwork.modules()):
+		for strName, moduleChild in list(moduleParent.named_children()):
+			if type(moduleChild) == torch.nn.Conv2d:
+				setattr(moduleParent, strName, QuantizedConvolution(moduleChild))
+			# end
+		# end
 	# end
 
-	if True:
-		tensorPreprocessedFirst = tensorFirst.view(1, 3, intHeight, intWidth)
-		tensorPreprocessedSecond = tensorSecond.view(1, 3, intHeight, intWidth)
+	for moduleChild in moduleNetwork.modules():
+		if type(moduleChild) == QuantizedConvolution:
+			moduleChild.qconfig = torch.ao.quantization.get_default_qconfig(torch.backends.quantized.engine)
+		# end
+	# end
 
-		intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
-		intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+	torch.ao.quantization.prepare(moduleNetwork, inplace=True)
 
-		tensorPreprocessedFirst = torch.nn.functional.interpolate(input=tensorPreprocessedFirst, size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
-		tensorPreprocessedSecond = torch.nn.functional.interpolate(input=tensorPreprocessedSecond, size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+	for tensorFirst, tensorSecond in objectPairs:
+		intPreprocessedWidth = int(math.floor(math.ceil(tensorFirst.size(3) / 64.0) * 64.0))
+		intPreprocessedHeight = int(math.floor(math.ceil(tensorFirst.size(2) / 64.0) * 64.0))
 
-		tensorFlow = 20.0 * torch.nn.functional.interpolate(input=moduleNetwork(tensorPreprocessedFirst, tensorPreprocessedSecond), size=(intHeight, intWidth), mode='bilinear', align_corners=False)
+		moduleNetwork(torch.nn.functional.interpolate(input=tensorFirst, size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False), torch.nn.functional.interpolate(input=tensorSecond, size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False))
+	# end
 
-		tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
-		tensorFlow[:, 1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+	torch.ao.quantization.convert(moduleNetwork, inplace=True)
+
+	return moduleNetwork
+# end
+
+def quantize_load(objectPairs=None, boolSave=True):
+	# the quantized network from the checkpoint next to the regular one, which is calibrated on the given pairs (by default the provided sample images) and stored if it does not exist yet or if it has been derived from different weights
+
+	assert(arguments_strDevice == 'cpu') # the quantized convolutions are only implemented on the cpu
+
+	strSource = checkpoint_identity('./network-' + arguments_strModel + '.pytorch') # the quantized checkpoint is recalibrated if it has not been derived from the current weights
 
-		tensorOutput.resize_(2, intHeight, intWidth).copy_(tensorFlow[0, :, :, :])
+	if objectPairs is None and os.path.isfile(Quantize_strFile) == True:
+		objectCheckpoint = torch.load(Quantize_strFile, map_location='cpu')
+
+		if objectCheckpoint.get('strSource') == strSource:
+			moduleNetwork = quantize_network(Network().eval())
+
+			moduleNetwork.load_state_dict(objectCheckpoint['objectState'])
+
+			return moduleNetwork
+		# end
 	# end
 
-	if True:
-		tensorFirst = tensorFirst.cpu()
-		tensorSecond = tensorSecond.cpu()
-		tensorOutput = tensorOutput.cpu()
+	if objectPairs is None:
+		objectPairs = [ (read_image(arguments_strFirst).unsqueeze(0), read_image(arguments_strSecond).unsqueeze(0)) ]
 	# end
 
-	return tensorOutput
+	moduleNetwork = quantize_network(Network().eval(), objectPairs)
+
+	if boolSave == True:
+		torch.save({ 'strSource': strSource, 'objectState': moduleNetwork.state_dict() }, Quantize_strFile)
+	# end
+
+	return moduleNetwork
+# end
+
+def read_image(strFile):
+	return torch.FloatTensor(numpy.array(PIL.Image.open(strFile))[:, :, ::-1].transpose(2, 0, 1).astype(numpy.float32) * (1.0 / 255.0))
+# end
+
+if arguments_strPrecision == 'int8':
+	moduleNetwork = quantize_load()
+
+elif arguments_strPrecision != 'int8':
+	moduleNetwork = Network().to(arguments_strDevice, Precision_objectTypes[arguments_strPrecision]).eval()
+
+# end
+
+if arguments_strLayout == 'nhwc':
+	moduleNetwork = moduleNetwork.to(memory_format=torch.channels_last)
+# end
+
+##########################################################
+
+def static_correlation(tensorFirst: torch.Tensor, tensorSecond: torch.Tensor, intVolume: int, boolLowered: bool) -> torch.Tensor:
+	if boolLowered == True:
+		return static_lowered(tensorFirst, tensorSecond, intVolume)
+	# end
+
+	if intVolume == 81:
+		return torch.ops.pwc.correlation(tensorFirst, tensorSecond)
+	# end
+
+	return torch.ops.pwc.correlation_horizontal(tensorFirst, tensorSecond)
+# end
+
+def static_lowered(tensorFirst: torch.Tensor, tensorSecond: torch.Tensor, intVolume: int) -> torch.Tensor:
+	# the correlation expressed through pad, slice, mul, and reduce over each displacement, such that it can be represented in runtimes without the custom operator
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+	intPadY = 4 if intVolume == 81 else 0
+
+	tensorPadded = torch.nn.functional.pad(input=tensorSecond, pad=[ 4, 4, intPadY, intPadY ], mode='constant', value=0.0)
+
+	tensorVolume = []
+
+	for intY in range((2 * intPadY) + 1):
+		for intX in range(9):
+			tensorVolume.append((tensorFirst * tensorPadded[:, :, intY:intY + intHeight, intX:intX + intWidth]).mean(1, True))
+		# end
+	# end
+
+	return torch.cat(tensorVolume, 1)
+# end
+
+def static_backward(tensorInput: torch.Tensor, tensorFlow: torch.Tensor) -> torch.Tensor:
+	# same as Backward but without the cache of the grids, such that it can be scripted and traced - the grid is in single precision as well
+
+	intHeight = tensorFlow.size(2)
+	intWidth = tensorFlow.size(3)
+
+	tensorHorizontal = (torch.arange(intWidth, device=tensorFlow.device).to(torch.float32) * (2.0 / (intWidth - 1.0)) - 1.0).view(1, 1, intWidth, 1).expand(1, intHeight, intWidth, 1)
+	tensorVertical = (torch.arange(intHeight, device=tensorFlow.device).to(torch.float32) * (2.0 / (intHeight - 1.0)) - 1.0).view(1, intHeight, 1, 1).expand(1, intHeight, intWidth, 1)
+
+	tensorGrid = torch.cat([ tensorHorizontal + (tensorFlow[:, 0:1, :, :].float().permute(0, 2, 3, 1) * (2.0 / (intWidth - 1.0))), tensorVertical + (tensorFlow[:, 1:2, :, :].float().permute(0, 2, 3, 1) * (2.0 / (intHeight - 1.0))) ], 3)
+
+	tensorOutput = torch.nn.functional.grid_sample(input=tensorInput.float(), grid=tensorGrid, mode='bilinear', padding_mode='zeros', align_corners=False)
+
+	tensorX = ((tensorGrid[:, :, :, 0] + 1.0) * tensorInput.size(3) - 1.0) / 2.0
+	tensorY = ((tensorGrid[:, :, :, 1] + 1.0) * tensorInput.size(2) - 1.0) / 2.0
+
+	tensorWeightX = (1.0 - torch.relu(-tensorX) - torch.relu(tensorX - (tensorInput.size(3) - 1.0))).clamp(min=0.0)
+	tensorWeightY = (1.0 - torch.relu(-tensorY) - torch.relu(tensorY - (tensorInput.size(2) - 1.0))).clamp(min=0.0)
+
+	return (tensorOutput * (tensorWeightX * tensorWeightY > 0.999).unsqueeze(1).to(tensorOutput.dtype)).to(tensorInput.dtype)
+# end
+
+class StaticDecoder(torch.nn.Module):
+	# the decoder of a given level with tensors instead of dictionaries, always forming the dense connections through concatenation
+
+	def __init__(self, moduleDecoder, boolLowered=False):
+		super(StaticDecoder, self).__init__()
+
+		if hasattr(moduleDecoder, 'moduleUpflow') == True:
+			self.moduleUpflow = moduleDecoder.moduleUpflow
+			self.moduleUpfeat = moduleDecoder.moduleUpfeat
+			self.dblBackward = moduleDecoder.dblBackward
+		# end
+
+		self.moduleOne = moduleDecoder.moduleOne
+		self.moduleTwo = moduleDecoder.moduleTwo
+		self.moduleThr = moduleDecoder.moduleThr
+		self.moduleFou = moduleDecoder.moduleFou
+		self.moduleFiv = moduleDecoder.moduleFiv
+		self.moduleSix = moduleDecoder.moduleSix
+
+		self.intVolume = moduleDecoder.intVolume
+		self.boolLowered = boolLowered
+	# end
+
+	def forward(self, tensorFirst: torch.Tensor, tensorSecond: torch.Tensor, tensorPrevious: typing.Optional[torch.Tensor], tensorPreviousFeat: typing.Optional[torch.Tensor]) -> typing.Tuple[torch.Tensor, torch.Tensor]:
+		if hasattr(self, 'moduleUpflow'): # resolved statically when scripting, the coarsest level has no previous estimate
+			assert(tensorPrevious is not None and tensorPreviousFeat is not None)
+
+			tensorFlow = self.moduleUpflow(tensorPrevious)
+
+			tensorVolume = torch.nn.functional.leaky_relu(input=static_correlation(tensorFirst, static_backward(tensorSecond, tensorFlow * self.dblBackward), self.intVolume, self.boolLowered), negative_slope=0.1)
+
+			tensorFeat = torch.cat([ tensorVolume, tensorFirst, tensorFlow, self.moduleUpfeat(tensorPreviousFeat) ], 1)
+
+		else:
+			tensorFeat = torch.nn.functional.leaky_relu(input=static_correlation(tensorFirst, tensorSecond, self.intVolume, self.boolLowered), negative_slope=0.1)
+
+		# end
+
+		tensorFeat = torch.cat([ self.moduleOne(tensorFeat), tensorFeat ], 1)
+		tensorFeat = torch.cat([ self.moduleTwo(tensorFeat), tensorFeat ], 1)
+		tensorFeat = torch.cat([ self.moduleThr(tensorFeat), tensorFeat ], 1)
+		tensorFeat = torch.cat([ self.moduleFou(tensorFeat), tensorFeat ], 1)
+		tensorFeat = torch.cat([ self.moduleFiv(tensorFeat), tensorFeat ], 1)
+
+		return self.moduleSix(tensorFeat), tensorFeat
+	# end
+# end
+
+class NetworkStatic(torch.nn.Module):
+	# graph-capturable variant of a loaded Network that shares its weights, without dictionaries, global state, or caches and with the correlation as a custom operator or lowered to standard operations - it always refines and ignores --dense, --release, --gate, and --sparse
+
+	def __init__(self, moduleNetwork, boolLowered=False):
+		super(NetworkStatic, self).__init__()
+
+		self.moduleExtractor = moduleNetwork.moduleExtractor
+
+		self.moduleTwo = StaticDecoder(moduleNetwork.moduleTwo, boolLowered)
+		self.moduleThr = StaticDecoder(moduleNetwork.moduleThr, boolLowered)
+		self.moduleFou = StaticDecoder(moduleNetwork.moduleFou, boolLowered)
+		self.moduleFiv = StaticDecoder(moduleNetwork.moduleFiv, boolLowered)
+		self.moduleSix = StaticDecoder(moduleNetwork.moduleSix, boolLowered)
+
+		self.moduleRefiner = moduleNetwork.moduleRefiner
+	# end
+
+	def forward(self, tensorFirst: torch.Tensor, tensorSecond: torch.Tensor) -> torch.Tensor:
+		tensorFirstPyramid = self.moduleExtractor(tensorFirst)
+		tensorSecondPyramid = self.moduleExtractor(tensorSecond)
+
+		tensorFlow, tensorFeat = self.moduleSix(tensorFirstPyramid[5], tensorSecondPyramid[5], None, None)
+		tensorFlow, tensorFeat = self.moduleFiv(tensorFirstPyramid[4], tensorSecondPyramid[4], tensorFlow, tensorFeat)
+		tensorFlow, tensorFeat = self.moduleFou(tensorFirstPyramid[3], tensorSecondPyramid[3], tensorFlow, tensorFeat)
+		tensorFlow, tensorFeat = self.moduleThr(tensorFirstPyramid[2], tensorSecondPyramid[2], tensorFlow, tensorFeat)
+		tensorFlow, tensorFeat = self.moduleTwo(tensorFirstPyramid[1], tensorSecondPyramid[1], tensorFlow, tensorFeat)
+
+		return (tensorFlow + self.moduleRefiner(tensorFeat)).float()
+	# end
+# end
+
+Static_strFile = './network-' + arguments_strModel + '-' + arguments_strPrecision + '-' + arguments_strLayout + '-' + arguments_strDevice.replace(':', '') + '-script.pytorch' # one artifact per configuration, since the precision, the layout, and the device are baked into the frozen graph
+
+def static_identity():
+	# everything the frozen graph has been derived from, the weights and their quantization as well as the precision, the layout, and the device - see static_load
+
+	strQuantized = checkpoint_identity(Quantize_strFile) if arguments_strPrecision == 'int8' and os.path.isfile(Quantize_strFile) == True else None
+
+	return str([ checkpoint_identity('./network-' + arguments_strModel + '.pytorch'), strQuantized, arguments_strPrecision, arguments_strLayout, arguments_strDevice ])
+# end
+
+def static_export(moduleNetwork, strFile=None):
+	# scripts the graph-capturable variant and freezes it such that the weights become constants, the file is self-contained except for the correlation operator which is registered by importing the correlation package - the prepacked weights of the cpu backend can not be serialized, which is why they are only prepacked after saving / loading
+
+	moduleScripted = torch.jit.freeze(torch.jit.script(NetworkStatic(moduleNetwork).eval()))
+
+	if strFile is not None:
+		torch.jit.save(moduleScripted, strFile, _extra_files={ 'strIdentity': static_identity() }) # what it has been derived from, see static_load
+	# end
+
+	return torch.jit.optimize_for_inference(moduleScripted)
+# end
+
+def static_load():
+	# the stored module is only used if it has been derived from the current weights and configuration, otherwise it is exported anew
+
+	if os.path.isfile(Static_strFile) == True:
+		objectExtra = { 'strIdentity': '' }
+
+		moduleScripted = torch.jit.load(Static_strFile, map_location=arguments_strDevice, _extra_files=objectExtra)
+
+		if objectExtra['strIdentity'] == static_identity().encode('utf-8'):
+			return torch.jit.optimize_for_inference(moduleScripted)
+		# end
+	# end
+
+	return static_export(moduleNetwork, Static_strFile)
+# end
+
+Onnx_intOpset = 17 # the first opset with GridSample is 16
+
+def onnx_export(moduleNetwork, intHeight, intWidth, strFile):
+	# exports the graph-capturable variant with the lowered correlation for a fixed resolution and a dynamic batch size, the warping becomes GridSample - a copy is exported since converting it to single precision on the cpu would otherwise modify the given network
+
+	tensorInput = torch.zeros(1, 3, intHeight, intWidth)
+
+	torch.onnx.export(NetworkStatic(copy.deepcopy(moduleNetwork), True).eval().float().cpu(), (tensorInput, tensorInput), strFile, input_names=[ 'first', 'second' ], output_names=[ 'flow' ], dynamic_axes={ 'first': { 0: 'batch' }, 'second': { 0: 'batch' }, 'flow': { 0: 'batch' } }, opset_version=Onnx_intOpset, dynamo=False)
+# end
+
+class OnnxBackend():
+	# runs the exported model through onnx runtime on the cpu, one model and session per resolution that are exported / created on demand
+
+	def __init__(self, moduleNetwork):
+		assert(onnxruntime is not None) # pip install onnxruntime
+
+		self.moduleNetwork = moduleNetwork
+		self.objectSessions = {}
+	# end
+
+	def session(self, intHeight, intWidth):
+		if (intHeight, intWidth) not in self.objectSessions:
+			strFile = './network-' + arguments_strModel + '-' + str(intHeight) + 'x' + str(intWidth) + '-' + checkpoint_identity('./network-' + arguments_strModel + '.pytorch')[:16] + '.onnx' # the name contains the hash of the weights the model is derived from, such that it is exported anew if they change
+
+			if os.path.isfile(strFile) == False:
+				onnx_export(self.moduleNetwork, intHeight, intWidth, strFile)
+			# end
+
+			self.objectSessions[(intHeight, intWidth)] = onnxruntime.InferenceSession(strFile, providers=[ 'CPUExecutionProvider' ])
+		# end
+
+		return self.objectSessions[(intHeight, intWidth)]
+	# end
+
+	def __call__(self, tensorFirst, tensorSecond):
+		objectSession = self.session(tensorFirst.size(2), tensorFirst.size(3))
+
+		return torch.from_numpy(objectSession.run([ 'flow' ], { 'first': tensorFirst.detach().float().cpu().numpy(), 'second': tensorSecond.detach().float().cpu().numpy() })[0]).to(tensorFirst.device)
+	# end
+# end
+
+if arguments_strBackend == 'script':
+	moduleBackend = static_load()
+
+elif arguments_strBackend == 'onnx':
+	moduleBackend = OnnxBackend(moduleNetwork)
+
+elif arguments_strBackend == 'compile':
+	moduleBackend = torch.compile(NetworkStatic(moduleNetwork).eval())
+
+elif arguments_strBackend == 'eager':
+	moduleBackend = moduleNetwork
+
+# end
+
+##########################################################
+
+Cache_strDirectory = os.environ.get('PWC_FLOW_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'pytorch-pwc', 'flow'))
+Cache_intCapacity = 1024 * 1048576 # size of the cache on disk in bytes, the least recently used flows are evicted beyond it
+Cache_strPrecision = 'float32' # precision of the stored flows, float32 makes a hit identical to recomputing while float16 is an explicit opt-in that halves the size on disk but is lossy
+Cache_objectStats = { 'intHits': 0, 'intMisses': 0, 'intDuplicates': 0, 'intEvicted': 0 }
+
+def cache_key(tensorFirst, tensorSecond):
+	# content hash of both images together with everything that affects the result
+
+	objectHash = hashlib.sha1()
+
+	for tensorInput in [ tensorFirst, tensorSecond ]:
+		tensorInput = tensorInput.detach().float().cpu().contiguous()
+
+		objectHash.update(str(list(tensorInput.size())).encode('utf-8'))
+		objectHash.update(tensorInput.numpy().tobytes())
+	# end
+
+	strQuantized = checkpoint_identity(Quantize_strFile) if arguments_strPrecision == 'int8' and os.path.isfile(Quantize_strFile) == True else None # the quantized network also depends on the pairs it has been calibrated on
+
+	objectHash.update(str([ arguments_strModel, checkpoint_identity('./network-' + arguments_strModel + '.pytorch'), arguments_strPrecision, strQuantized, arguments_strBackend, arguments_strLayout, arguments_strGate, arguments_dblGate, arguments_strSparse, 64, 'bilinear', Cache_strPrecision ]).encode('utf-8')) # the model and its weights, the settings that alter the flow, the preprocessing which resizes to a multiple of 64, and the precision of the stored flow
+
+	return objectHash.hexdigest()
+# end
+
+def cache_load(strKey):
+	strFile = os.path.join(Cache_strDirectory, strKey + '.npz')
+
+	try:
+		with numpy.load(strFile) as objectFile:
+			tensorFlow = torch.from_numpy(objectFile['flow'].astype(numpy.float32))
+		# end
+
+		os.utime(strFile, None) # the modification time serves as the recency for the eviction
+	except:
+		return None # a missing or corrupted entry simply means that the flow gets computed again
+	# end
+
+	return tensorFlow
+# end
+
+def cache_store(strKey, tensorFlow):
+	try:
+		os.makedirs(Cache_strDirectory, exist_ok=True)
+
+		strFile = os.path.join(Cache_strDirectory, strKey + '.npz')
+
+		with open(strFile + '.tmp', 'wb') as objectFile:
+			numpy.savez_compressed(objectFile, flow=tensorFlow.float().cpu().numpy().astype(Cache_strPrecision))
+		# end
+
+		os.replace(strFile + '.tmp', strFile)
+
+		cache_evict()
+	except:
+		pass # not being able to persist the flow should not prevent the inference from running
+	# end
+# end
+
+def cache_evict():
+	objectEntries = []
+
+	for strFile in os.listdir(Cache_strDirectory):
+		if strFile.endswith('.npz') == True:
+			objectStat = os.stat(os.path.join(Cache_strDirectory, strFile))
+
+			objectEntries.append((objectStat.st_mtime, objectStat.st_size, strFile))
+		# end
+	# end
+
+	intSize = sum([ objectEntry[1] for objectEntry in objectEntries ])
+
+	for dblTime, intFile, strFile in sorted(objectEntries):
+		if intSize <= Cache_intCapacity:
+			break
+		# end
+
+		os.remove(os.path.join(Cache_strDirectory, strFile))
+
+		intSize -= intFile
+
+		Cache_objectStats['intEvicted'] += 1
+	# end
+# end
+
+def cache_estimate(tensorFirst, tensorSecond, functionEstimate):
+	# short-circuits exact duplicates to zero flow and otherwise looks up the flow by the content hash before calling functionEstimate
+
+	if torch.equal(tensorFirst, tensorSecond) == True:
+		Cache_objectStats['intDuplicates'] += 1
+
+		return torch.zeros(2, tensorFirst.size(1), tensorFirst.size(2))
+	# end
+
+	strKey = cache_key(tensorFirst, tensorSecond)
+
+	tensorFlow = cache_load(strKey)
+
+	if tensorFlow is not None:
+		Cache_objectStats['intHits'] += 1
+
+		return tensorFlow
+	# end
+
+	Cache_objectStats['intMisses'] += 1
+
+	tensorFlow = functionEstimate(tensorFirst, tensorSecond)
+
+	cache_store(strKey, tensorFlow)
+
+	return tensorFlow
+# end
+
+def estimate(tensorFirst, tensorSecond, roi=None):
+	# roi is either a list of (left, top, right, bottom) boxes, in which case a list of flows for these boxes is returned, or a [H, W] mask, in which case the full flow is returned but only valid inside of the mask
+
+	assert(tensorFirst.size(1) == tensorSecond.size(1))
+	assert(tensorFirst.size(2) == tensorSecond.size(2))
+
+	intWidth = tensorFirst.size(2)
+	intHeight = tensorFirst.size(1)
+
+	if roi is not None:
+		if (torch.is_tensor(roi) == True or type(roi) == numpy.ndarray) and len(roi.shape) == 2:
+			return estimate_roi(tensorFirst.view(1, 3, intHeight, intWidth), tensorSecond.view(1, 3, intHeight, intWidth), [ roi ], boolFull=True)[0][0, :, :, :]
+		# end
+
+		return estimate_roi(tensorFirst.view(1, 3, intHeight, intWidth), tensorSecond.view(1, 3, intHeight, intWidth), [ roi ])[0]
+	# end
+
+	assert(intWidth == 1024) # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
+	assert(intHeight == 436) # remember that there is no guarantee for correctness, comment this line out if you acknowledge this and want to continue
+
+	if arguments_strCache == 'disk':
+		return cache_estimate(tensorFirst, tensorSecond, lambda tensorFirst, tensorSecond: estimate_batch(tensorFirst.view(1, 3, intHeight, intWidth), tensorSecond.view(1, 3, intHeight, intWidth))[0, :, :, :])
+	# end
+
+	return estimate_batch(tensorFirst.view(1, 3, intHeight, intWidth), tensorSecond.view(1, 3, intHeight, intWidth))[0, :, :, :]
+# end
+
+def estimate_stack(objectInput):
+	# accepts either a [N, 3, H, W] tensor or a list of [3, H, W] tensors / numpy arrays that have been prepared like in __main__
+
+	if torch.is_tensor(objectInput) == True:
+		return objectInput.float()
+	# end
+
+	return torch.stack([ torch.as_tensor(objectElement).float() for objectElement in objectInput ], 0)
+# end
+
+def estimate_batch(tensorFirst, tensorSecond, intBatch=8, intBudget=None, moduleEstimate=None):
+	# moduleEstimate is the network to run, by default the backend that has been selected through arguments_strBackend
+
+	if moduleEstimate is None:
+		moduleEstimate = moduleBackend
+	# end
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+
+	intSamples = tensorFirst.size(0)
+	intWidth = tensorFirst.size(3)
+	intHeight = tensorFirst.size(2)
+
+	if intBudget is None:
+		intBudget = arguments_intBudget * 1048576
+	# end
+
+	if intBudget > 0:
+		strSchedule, intSchedule = memory_schedule(min(intBatch, intSamples), intHeight, intWidth, intBudget)
+
+		if strSchedule == 'tiled':
+			return estimate_tiled(tensorFirst, tensorSecond, intSchedule, min(256, intSchedule // 4), 1, moduleEstimate, intBudget)
+		# end
+
+		intBatch = intSchedule
+	# end
+
+	intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+	intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+	tensorOutput = torch.FloatTensor(intSamples, 2, intHeight, intWidth)
+
+	for intStart in range(0, intSamples, intBatch):
+		intStop = min(intStart + intBatch, intSamples)
+
+		tensorPreprocessedFirst = tensorFirst[intStart:intStop, :, :, :].to(arguments_strDevice)
+		tensorPreprocessedSecond = tensorSecond[intStart:intStop, :, :, :].to(arguments_strDevice)
+
+		tensorPreprocessedFirst = torch.nn.functional.interpolate(input=tensorPreprocessedFirst, size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+		tensorPreprocessedSecond = torch.nn.functional.interpolate(input=tensorPreprocessedSecond, size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow = 20.0 * torch.nn.functional.interpolate(input=moduleEstimate(tensorPreprocessedFirst, tensorPreprocessedSecond), size=(intHeight, intWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
+		tensorFlow[:, 1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+
+		tensorOutput[intStart:intStop, :, :, :].copy_(tensorFlow)
+	# end
+
+	return tensorOutput
+# end
+
+def estimate_bidirectional(tensorFirst, tensorSecond, intBatch=8, dblAlpha=0.01, dblBeta=0.5):
+	# forward and backward flow with each pyramid only being extracted once, both directions are decoded as a single batch - returns the forward flow, the backward flow, and the occlusion masks of the first and the second image
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+
+	intSamples = tensorFirst.size(0)
+	intWidth = tensorFirst.size(3)
+	intHeight = tensorFirst.size(2)
+
+	intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+	intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+	tensorForward = torch.FloatTensor(intSamples, 2, intHeight, intWidth)
+	tensorBackward = torch.FloatTensor(intSamples, 2, intHeight, intWidth)
+
+	for intStart in range(0, intSamples, intBatch):
+		intStop = min(intStart + intBatch, intSamples)
+
+		tensorPreprocessedFirst = torch.nn.functional.interpolate(input=tensorFirst[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+		tensorPreprocessedSecond = torch.nn.functional.interpolate(input=tensorSecond[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+
+		tensorPyramidFirst = moduleNetwork.moduleExtractor(tensorPreprocessedFirst)
+		tensorPyramidSecond = moduleNetwork.moduleExtractor(tensorPreprocessedSecond)
+
+		tensorFlow = moduleNetwork.decode([ torch.cat([ tensorOne, tensorTwo ], 0) for tensorOne, tensorTwo in zip(tensorPyramidFirst, tensorPyramidSecond) ], [ torch.cat([ tensorTwo, tensorOne ], 0) for tensorOne, tensorTwo in zip(tensorPyramidFirst, tensorPyramidSecond) ])
+
+		tensorPyramidFirst = None
+		tensorPyramidSecond = None
+
+		tensorFlow = 20.0 * torch.nn.functional.interpolate(input=tensorFlow, size=(intHeight, intWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
+		tensorFlow[:, 1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+
+		tensorForward[intStart:intStop, :, :, :].copy_(tensorFlow[:intStop - intStart, :, :, :])
+		tensorBackward[intStart:intStop, :, :, :].copy_(tensorFlow[intStop - intStart:, :, :, :])
+	# end
+
+	tensorOcclusion = flow_occlusion(torch.cat([ tensorForward, tensorBackward ], 0), torch.cat([ tensorBackward, tensorForward ], 0), dblAlpha, dblBeta)
+
+	return tensorForward, tensorBackward, tensorOcclusion[:intSamples, :, :, :], tensorOcclusion[intSamples:, :, :, :]
+# end
+
+def flow_occlusion(tensorForward, tensorBackward, dblAlpha=0.01, dblBeta=0.5):
+	# forward-backward consistency check, a pixel is occluded if the backward flow at its destination does not point back to it or if its destination is outside of the image
+
+	intHeight = tensorForward.size(2)
+	intWidth = tensorForward.size(3)
+
+	tensorX = torch.arange(0.0, intWidth, dtype=tensorForward.dtype, device=tensorForward.device).view(1, 1, 1, -1) + tensorForward[:, 0:1, :, :]
+	tensorY = torch.arange(0.0, intHeight, dtype=tensorForward.dtype, device=tensorForward.device).view(1, 1, -1, 1) + tensorForward[:, 1:2, :, :]
+
+	tensorGrid = torch.cat([ (2.0 * tensorX / max(intWidth - 1, 1)) - 1.0, (2.0 * tensorY / max(intHeight - 1, 1)) - 1.0 ], 1).permute(0, 2, 3, 1) # unlike Backward, the flow is sampled at pixel centers such that zero flow is consistent at the border as well
+
+	tensorWarped = torch.nn.functional.grid_sample(input=tensorBackward, grid=tensorGrid, mode='bilinear', padding_mode='border', align_corners=True)
+
+	tensorSum = (tensorForward + tensorWarped).pow(2.0).sum(1, True)
+	tensorMagnitude = tensorForward.pow(2.0).sum(1, True) + tensorWarped.pow(2.0).sum(1, True)
+
+	tensorOutside = (tensorX < 0.0) | (tensorX > intWidth - 1.0) | (tensorY < 0.0) | (tensorY > intHeight - 1.0)
+
+	return (tensorSum > (dblAlpha * tensorMagnitude) + dblBeta) | tensorOutside
+# end
+
+moduleDisparity = None # network with the horizontal cost volume, only instantiated once it is needed
+
+def estimate_disparity(tensorFirst, tensorSecond, intBatch=8):
+	# for rectified stereo pairs, returns the horizontal component of the flow from the first to the second image as [N, 1, H, W], which is the negative disparity if the first image is the left view
+
+	global moduleDisparity
+
+	if moduleDisparity is None:
+		moduleDisparity = Network('horizontal').to(arguments_strDevice, Precision_objectTypes.get(arguments_strPrecision, torch.float32)).eval()
+	# end
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+
+	intSamples = tensorFirst.size(0)
+	intWidth = tensorFirst.size(3)
+	intHeight = tensorFirst.size(2)
+
+	intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+	intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+	tensorOutput = torch.FloatTensor(intSamples, 1, intHeight, intWidth)
+
+	for intStart in range(0, intSamples, intBatch):
+		intStop = min(intStart + intBatch, intSamples)
+
+		tensorPreprocessedFirst = torch.nn.functional.interpolate(input=tensorFirst[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+		tensorPreprocessedSecond = torch.nn.functional.interpolate(input=tensorSecond[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow = moduleDisparity(tensorPreprocessedFirst, tensorPreprocessedSecond)[:, 0:1, :, :] # the network still estimates two channels, the vertical one is simply discarded
+
+		tensorOutput[intStart:intStop, :, :, :].copy_(20.0 * torch.nn.functional.interpolate(input=tensorFlow, size=(intHeight, intWidth), mode='bilinear', align_corners=False) * (float(intWidth) / float(intPreprocessedWidth)))
+	# end
+
+	return tensorOutput
+# end
+
+Roi_intReceptive = 132 # the refiner alone sees 33 pixels in each direction at a quarter of the resolution, a box with less context than this does not get the flow it would get on the full frame
+Roi_intContext = int(math.ceil(Roi_intReceptive / 64.0) * 64.0) # default context around each box, the receptive field rounded up to the granularity of the network
+
+def estimate_roi(tensorFirst, tensorSecond, objectRois, intContext=None, boolFull=False, intBatch=8):
+	# objectRois contains for each pair either a list of (left, top, right, bottom) boxes or a [H, W] mask, each box is cropped with intContext pixels of context for the receptive field and the crop is grown to a multiple of 64 such that it does not need to be resized, crops of the same size are batched
+
+	if intContext is None:
+		intContext = Roi_intContext
+	# end
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+	assert(len(objectRois) == tensorFirst.size(0))
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	def extend(intStart, intStop, intTotal):
+		intSize = min(int(math.ceil((intStop - intStart + (2 * intContext)) / 64.0) * 64.0), intTotal)
+		intCrop = min(max(((intStart + intStop) // 2) - (intSize // 2), 0), intTotal - intSize)
+
+		return intCrop, intCrop + intSize
+	# end
+
+	objectBoxes = []
+	tensorValid = torch.zeros(tensorFirst.size(0), 1, intHeight, intWidth, dtype=torch.bool)
+
+	for intSample, objectRoi in enumerate(objectRois):
+		if (torch.is_tensor(objectRoi) == True or type(objectRoi) == numpy.ndarray) and len(objectRoi.shape) == 2:
+			tensorMask = torch.as_tensor(objectRoi) != 0
+
+			if tensorMask.any() == False:
+				objectBoxes.append([])
+				continue
+			# end
+
+			tensorY = tensorMask.any(1).nonzero()
+			tensorX = tensorMask.any(0).nonzero()
+
+			objectRoi = [ (tensorX.min().item(), tensorY.min().item(), tensorX.max().item() + 1, tensorY.max().item() + 1) ]
+
+			tensorValid[intSample, 0, :, :] = tensorMask
+		# end
+
+		objectBoxes.append([ (max(int(intLeft), 0), max(int(intTop), 0), min(int(intRight), intWidth), min(int(intBottom), intHeight)) for intLeft, intTop, intRight, intBottom in objectRoi ])
+	# end
+
+	objectGroups = collections.defaultdict(list)
+
+	for intSample, objectRoi in enumerate(objectBoxes):
+		for intBox, (intLeft, intTop, intRight, intBottom) in enumerate(objectRoi):
+			intCropTop, intCropBottom = extend(intTop, intBottom, intHeight)
+			intCropLeft, intCropRight = extend(intLeft, intRight, intWidth)
+
+			objectGroups[(intCropBottom - intCropTop, intCropRight - intCropLeft)].append((intSample, intBox, intCropTop, intCropLeft))
+		# end
+	# end
+
+	objectFlows = [ [ None ] * len(objectRoi) for objectRoi in objectBoxes ]
+
+	for (intCropHeight, intCropWidth), objectCrops in objectGroups.items():
+		tensorFlow = estimate_batch(
+			torch.stack([ tensorFirst[intSample, :, intCropTop:intCropTop + intCropHeight, intCropLeft:intCropLeft + intCropWidth] for intSample, intBox, intCropTop, intCropLeft in objectCrops ], 0),
+			torch.stack([ tensorSecond[intSample, :, intCropTop:intCropTop + intCropHeight, intCropLeft:intCropLeft + intCropWidth] for intSample, intBox, intCropTop, intCropLeft in objectCrops ], 0),
+			intBatch
+		)
+
+		for intCrop, (intSample, intBox, intCropTop, intCropLeft) in enumerate(objectCrops):
+			intLeft, intTop, intRight, intBottom = objectBoxes[intSample][intBox]
+
+			objectFlows[intSample][intBox] = tensorFlow[intCrop, :, intTop - intCropTop:intBottom - intCropTop, intLeft - intCropLeft:intRight - intCropLeft]
+		# end
+	# end
+
+	if boolFull == False:
+		return objectFlows
+	# end
+
+	tensorOutput = torch.zeros(tensorFirst.size(0), 2, intHeight, intWidth)
+
+	for intSample, objectRoi in enumerate(objectBoxes):
+		for intBox, (intLeft, intTop, intRight, intBottom) in enumerate(objectRoi):
+			tensorOutput[intSample, :, intTop:intBottom, intLeft:intRight] = objectFlows[intSample][intBox]
+
+			if (torch.is_tensor(objectRois[intSample]) == False and type(objectRois[intSample]) != numpy.ndarray) or len(objectRois[intSample].shape) != 2:
+				tensorValid[intSample, 0, intTop:intBottom, intLeft:intRight] = True
+			# end
+		# end
+	# end
+
+	return tensorOutput * tensorValid.float(), tensorValid
+# end
+
+def estimate_coarse(tensorFirst, tensorSecond, intLevel=2, boolRefiner=True, intSize=None, intBatch=8):
+	# stops decoding at the given level and returns the flow at the native resolution of that level (a 2**intLevel fraction of the input resized to a multiple of 64), or at intSize=(height, width) if given, without running any of the finer decoders
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+	assert(intLevel in [ 2, 3, 4, 5, 6 ])
+
+	intSamples = tensorFirst.size(0)
+	intWidth = tensorFirst.size(3)
+	intHeight = tensorFirst.size(2)
+
+	intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+	intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+	intOutputHeight, intOutputWidth = intSize if intSize is not None else (intPreprocessedHeight >> intLevel, intPreprocessedWidth >> intLevel)
+
+	tensorOutput = torch.FloatTensor(intSamples, 2, intOutputHeight, intOutputWidth)
+
+	for intStart in range(0, intSamples, intBatch):
+		intStop = min(intStart + intBatch, intSamples)
+
+		tensorPreprocessedFirst = torch.nn.functional.interpolate(input=tensorFirst[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+		tensorPreprocessedSecond = torch.nn.functional.interpolate(input=tensorSecond[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow = moduleNetwork(tensorPreprocessedFirst, tensorPreprocessedSecond, intLevel=intLevel, boolRefiner=boolRefiner)
+
+		if intSize is not None:
+			tensorFlow = torch.nn.functional.interpolate(input=tensorFlow, size=(intOutputHeight, intOutputWidth), mode='bilinear', align_corners=False)
+		# end
+
+		# the network predicts displacements in pixels of the preprocessed input divided by 20 at every level
+
+		tensorOutput[intStart:intStop, 0, :, :] = tensorFlow[:, 0, :, :] * (20.0 * float(intOutputWidth) / float(intPreprocessedWidth))
+		tensorOutput[intStart:intStop, 1, :, :] = tensorFlow[:, 1, :, :] * (20.0 * float(intOutputHeight) / float(intPreprocessedHeight))
+	# end
+
+	return tensorOutput
+# end
+
+def memory_resident():
+	return int(open('/proc/self/statm', 'r').read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+# end
+
+def memory_peak(functionRun):
+	# peak memory above the baseline while executing functionRun, uses the allocator statistics on the gpu and samples the resident set size on the cpu
+
+	gc.collect()
+
+	if arguments_strDevice.startswith('cuda') == True:
+		torch.cuda.synchronize()
+		torch.cuda.reset_peak_memory_stats()
+
+		intBaseline = torch.cuda.memory_allocated()
+
+		functionRun()
+
+		torch.cuda.synchronize()
+
+		return torch.cuda.max_memory_allocated() - intBaseline
+	# end
+
+	try:
+		ctypes.CDLL('libc.so.6').malloc_trim(0) # return freed memory to the system such that the baseline is meaningful
+	except:
+		pass
+	# end
+
+	intBaseline = memory_resident()
+	intPeak = [ intBaseline ]
+	objectDone = threading.Event()
+
+	def sample():
+		while objectDone.wait(0.001) == False:
+			intPeak[0] = max(intPeak[0], memory_resident())
+		# end
+	# end
+
+	objectThread = threading.Thread(target=sample)
+	objectThread.start()
+
+	functionRun()
+
+	objectDone.set()
+	objectThread.join()
+
+	return max(intPeak[0], memory_resident()) - intBaseline
+# end
+
+def benchmark_release(intSizes=[ (256, 256), (436, 1024), (1080, 1920), (2160, 3840) ]):
+	global arguments_strRelease
+
+	objectReport = {}
+	strRelease = arguments_strRelease
+
+	for intHeight, intWidth in intSizes:
+		tensorFirst = torch.rand(1, 3, intHeight, intWidth)
+		tensorSecond = torch.rand(1, 3, intHeight, intWidth)
+
+		estimate_batch(tensorFirst, tensorSecond) # warmup, which also runs the autotuner of the correlation
+
+		objectReport[(intHeight, intWidth)] = {}
+
+		for arguments_strRelease in [ 'late', 'early' ]:
+			objectReport[(intHeight, intWidth)][arguments_strRelease] = memory_peak(lambda: estimate_batch(tensorFirst, tensorSecond))
+		# end
+
+		print('{:d}x{:d}: {:.1f} MB peak with late release, {:.1f} MB peak with early release, {:.1f}% reduction'.format(intWidth, intHeight, objectReport[(intHeight, intWidth)]['late'] / 1048576.0, objectReport[(intHeight, intWidth)]['early'] / 1048576.0, 100.0 - (100.0 * objectReport[(intHeight, intWidth)]['early'] / max(objectReport[(intHeight, intWidth)]['late'], 1))))
+	# end
+
+	arguments_strRelease = strRelease
+
+	return objectReport
+# end
+
+Memory_dblCalibration = None # ratio between the measured and the analytical peak memory, see memory_calibrate - it is calibrated before the first schedule is made if it has not been set explicitly
+Memory_dblMargin = 1.3 # safety margin on top of the calibrated model, which covers the fragmentation of the allocator that grows with the batch size and the noise of the measurement
+
+def memory_model(intSamples, intHeight, intWidth, intElement=4):
+	# analytical model of the memory that is required on top of the weights, every entry is in bytes and the peak is the maximum over the stages of the network
+
+	intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+	intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+	intPixels = [ (intPreprocessedHeight >> intLevel) * (intPreprocessedWidth >> intLevel) for intLevel in range(7) ]
+	intPyramid = [ 3, 16, 32, 64, 96, 128, 196 ]
+	intFeat = [ None, None, 81 + 32 + 2 + 2, 81 + 64 + 2 + 2, 81 + 96 + 2 + 2, 81 + 128 + 2 + 2, 81 ]
+
+	boolPreallocate = arguments_strDense == 'preallocate' and arguments_strLayout != 'nhwc'
+
+	# a convolution temporarily needs a reordered copy of its input as well as about twice its output on top of the input and the output themselves
+
+	objectModel = {}
+
+	objectModel['intInput'] = intSamples * 2 * 3 * (intHeight * intWidth + intPixels[0])
+	objectModel['intExtractor'] = intSamples * (2 * sum([ intPyramid[intLevel] * intPixels[intLevel] for intLevel in range(1, 7) ]) + max([ 2 * intPyramid[intLevel - 1] * intPixels[intLevel - 1] + 4 * intPyramid[intLevel] * intPixels[intLevel] for intLevel in range(1, 7) ]))
+
+	for intLevel in [ 6, 5, 4, 3, 2 ]:
+		intPyramidLeft = 2 * sum([ intPyramid[intOther] * intPixels[intOther] for intOther in (range(2, intLevel + 1) if arguments_strRelease == 'early' else range(1, 7)) ])
+		intPrevious = 2 * (intFeat[intLevel + 1] + 448) * intPixels[intLevel + 1] if intLevel < 6 else 0 # the upsampling of the previous features needs a copy of them as well
+		intCorrelation = (81 + 5 * intPyramid[intLevel] + 8) * intPixels[intLevel] # padded / warped / product copies of the second features, the output, and the temporaries of the warping
+		intDense = (intFeat[intLevel] + 448) * intPixels[intLevel] * (1 if boolPreallocate == True else 2)
+		intConvolution = (intFeat[intLevel] + 448 - 32 + (3 * 128)) * intPixels[intLevel] # the dense convolutions run per sample when preallocating
+
+		objectModel['intDecoder' + str(intLevel)] = (intSamples * (intPyramidLeft + intPrevious + intCorrelation + intDense)) + ((1 if boolPreallocate == True else intSamples) * intConvolution)
+		objectModel['intCorrelation' + str(intLevel)] = intSamples * intCorrelation
+	# end
+
+	objectModel['intRefiner'] = intSamples * (((2 * (intFeat[2] + 448)) + 2 + (3 * 128)) * intPixels[2] + (0 if arguments_strRelease == 'early' else 2 * sum([ intPyramid[intLevel] * intPixels[intLevel] for intLevel in range(1, 7) ])))
+	objectModel['intOutput'] = intSamples * 2 * (intPixels[2] + 2 * intHeight * intWidth)
+
+	for strKey in list(objectModel.keys()):
+		objectModel[strKey] *= intElement
+	# end
+
+	objectModel['intPeak'] = int(Memory_dblMargin * (Memory_dblCalibration if Memory_dblCalibration is not None else 1.0) * (objectModel['intInput'] + max([ objectModel['intExtractor'], objectModel['intRefiner'], objectModel['intOutput'] ] + [ objectModel['intDecoder' + str(intLevel)] for intLevel in [ 6, 5, 4, 3, 2 ] ])))
+
+	return objectModel
+# end
+
+def memory_calibrate(intHeight=256, intWidth=512, intSamples=[ 1, 2 ]):
+	# measures the actual peak for each of the given batch sizes and scales the analytical model by the largest ratio, which accounts for allocator overhead and temporaries that are not being modelled
+
+	global Memory_dblCalibration
+
+	Memory_dblCalibration = 1.0
+
+	dblRatios = []
+
+	for intSample in intSamples:
+		tensorFirst = torch.rand(intSample, 3, intHeight, intWidth)
+		tensorSecond = torch.rand(intSample, 3, intHeight, intWidth)
+
+		estimate_batch(tensorFirst, tensorSecond, intBudget=0) # warmup, which also runs the autotuner of the correlation
+
+		dblRatios.append(float(memory_peak(lambda: estimate_batch(tensorFirst, tensorSecond, intBudget=0))) / float(memory_model(intSample, intHeight, intWidth)['intPeak'] / Memory_dblMargin))
+	# end
+
+	Memory_dblCalibration = max(dblRatios)
+
+	return Memory_dblCalibration
+# end
+
+def memory_schedule(intSamples, intHeight, intWidth, intBudget):
+	# returns ('batch', micro-batch size) if at least one sample fits the budget at full resolution, otherwise ('tiled', tile size)
+
+	if Memory_dblCalibration is None:
+		memory_calibrate()
+	# end
+
+	for intBatch in range(intSamples, 0, -1):
+		if memory_model(intBatch, intHeight, intWidth)['intPeak'] <= intBudget:
+			return 'batch', intBatch
+		# end
+	# end
+
+	for intTile in [ 2048, 1536, 1024, 768, 512, 384, 256 ]:
+		if intTile < max(intHeight, intWidth) and memory_model(1, min(intTile, intHeight), min(intTile, intWidth))['intPeak'] <= intBudget:
+			return 'tiled', intTile
+		# end
+	# end
+
+	raise MemoryError('a budget of ' + str(intBudget) + ' bytes is insufficient even when tiling')
+# end
+
+class Plan():
+	# planned execution for a fixed number of samples and resolution, every intermediate that allows it is allocated once in the arena and then reused by subsequent calls
+
+	def __init__(self, intSamples, intHeight, intWidth):
+		self.intSamples = intSamples
+		self.intHeight = intHeight
+		self.intWidth = intWidth
+
+		self.intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+		self.intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+		self.objectBuffers = collections.defaultdict(dict)
+	# end
+
+	def arena(self):
+		# number of bytes that are held by the arena, only complete after the first call
+
+		return sum([ tensorBuffer.numel() * tensorBuffer.element_size() for objectBuffers in self.objectBuffers.values() for tensorBuffer in objectBuffers.values() ])
+	# end
+
+	def estimate(self, tensorFirst, tensorSecond, tensorOutput=None):
+		assert(list(tensorFirst.size()) == [ self.intSamples, 3, self.intHeight, self.intWidth ])
+		assert(list(tensorSecond.size()) == [ self.intSamples, 3, self.intHeight, self.intWidth ])
+
+		if tensorOutput is None:
+			tensorOutput = torch.FloatTensor(self.intSamples, 2, self.intHeight, self.intWidth)
+		# end
+
+		tensorLike = torch.empty(0, device=next(moduleNetwork.parameters()).device) # the inputs are staged in single precision, the network casts them to the type of its weights
+
+		tensorPreprocessed = correlation.correlation_buffer(self.objectBuffers['estimate'], 'tensorInput', tensorLike, [ 2, self.intSamples, 3, self.intPreprocessedHeight, self.intPreprocessedWidth ])
+
+		for intInput, tensorInput in enumerate([ tensorFirst, tensorSecond ]):
+			if self.intPreprocessedWidth != self.intWidth or self.intPreprocessedHeight != self.intHeight:
+				torch.ops.aten.upsample_bilinear2d.out(tensorInput.to(tensorLike.device, torch.float32), [ self.intPreprocessedHeight, self.intPreprocessedWidth ], False, None, None, out=tensorPreprocessed[intInput, :, :, :, :]) # same as interpolate with align_corners=False, but writes into the arena instead of allocating
+
+			elif self.intPreprocessedWidth == self.intWidth and self.intPreprocessedHeight == self.intHeight:
+				tensorPreprocessed[intInput, :, :, :, :] = tensorInput
+
+			# end
+		# end
+
+		if moduleBackend is moduleNetwork:
+			tensorFlow = moduleNetwork(tensorPreprocessed[0, :, :, :, :], tensorPreprocessed[1, :, :, :, :], self.objectBuffers)
+
+		elif moduleBackend is not moduleNetwork:
+			tensorFlow = moduleBackend(tensorPreprocessed[0, :, :, :, :], tensorPreprocessed[1, :, :, :, :]).float() # the other backends manage their intermediates themselves, only the inputs and the output are planned
+
+		# end
+
+		tensorFlow = torch.nn.functional.interpolate(input=tensorFlow, size=(self.intHeight, self.intWidth), mode='bilinear', align_corners=False)
+
+		tensorOutput[:, 0, :, :] = tensorFlow[:, 0, :, :] * (20.0 * float(self.intWidth) / float(self.intPreprocessedWidth))
+		tensorOutput[:, 1, :, :] = tensorFlow[:, 1, :, :] * (20.0 * float(self.intHeight) / float(self.intPreprocessedHeight))
+
+		return tensorOutput
+	# end
+# end
+
+Warm_dblFallback = 0.9 # the warm start is considered diverged if its photometric error is not below this fraction of the error without motion compensation
+Warm_dblFloor = 0.01 # photometric error below which the warm start is always accepted, avoids falling back on static content
+Warm_objectStats = { 'intWarm': 0, 'intFallback': 0 }
+
+def warm_previous(tensorPrior, intLevel, intPreprocessedHeight, intPreprocessedWidth):
+	# turns a [N, 2, H, W] flow in pixels of the input into the estimate of the level above intLevel, such that decoding can start at intLevel - there are no decoder features for it, which the decoder substitutes with zeros
+
+	intHeight = tensorPrior.size(2)
+	intWidth = tensorPrior.size(3)
+
+	tensorFlow = torch.nn.functional.interpolate(input=tensorPrior.to(arguments_strDevice), size=(intPreprocessedHeight >> (intLevel + 1), intPreprocessedWidth >> (intLevel + 1)), mode='area')
+
+	tensorFlow = torch.cat([ tensorFlow[:, 0:1, :, :] * (float(intPreprocessedWidth) / float(intWidth) / 20.0), tensorFlow[:, 1:2, :, :] * (float(intPreprocessedHeight) / float(intHeight) / 20.0) ], 1)
+
+	return { 'tensorFlow': tensorFlow, 'tensorFeat': None }
+# end
+
+def warm_error(tensorFirst, tensorSecond, tensorFlow):
+	# mean photometric error per sample after warping the preprocessed second image with the output of the network, only considering pixels that are warped from within the image
+
+	tensorFlow = 20.0 * torch.nn.functional.interpolate(input=tensorFlow, size=(tensorFirst.size(2), tensorFirst.size(3)), mode='bilinear', align_corners=False)
+
+	tensorWarped = Backward(tensorInput=torch.cat([ tensorSecond, torch.ones_like(tensorSecond[:, 0:1, :, :]) ], 1), tensorFlow=tensorFlow)
+
+	tensorMask = tensorWarped[:, -1:, :, :]
+
+	return ((tensorFirst - tensorWarped[:, :-1, :, :]).abs().mean(1, True) * tensorMask).sum([ 1, 2, 3 ]) / (tensorMask.sum([ 1, 2, 3 ]) + 0.00001)
+# end
+
+def warm_decode(tensorFirst, tensorSecond, tensorPyramidFirst, tensorPyramidSecond, tensorPrior, intLevel=4, objectBuffers=None):
+	# decodes from intLevel onwards given the prior flow, samples for which the warm start diverged are decoded again from scratch using the same pyramids
+
+	Warm_objectStats['intWarm'] += tensorFirst.size(0)
+
+	tensorFlow = moduleNetwork.decode(tensorPyramidFirst, tensorPyramidSecond, objectBuffers, objectPrevious=warm_previous(tensorPrior, intLevel, tensorFirst.size(2), tensorFirst.size(3)), intStart=intLevel)
+
+	tensorError = warm_error(tensorFirst, tensorSecond, tensorFlow)
+	tensorDiverged = (tensorError > Warm_dblFallback * warm_error(tensorFirst, tensorSecond, torch.zeros_like(tensorFlow))) & (tensorError > Warm_dblFloor)
+
+	if tensorDiverged.any() == True:
+		Warm_objectStats['intFallback'] += int(tensorDiverged.sum().item())
+
+		tensorFlow[tensorDiverged] = moduleNetwork.decode([ tensorLevel[tensorDiverged] if tensorLevel is not None else None for tensorLevel in tensorPyramidFirst ], [ tensorLevel[tensorDiverged] if tensorLevel is not None else None for tensorLevel in tensorPyramidSecond ], objectBuffers)
+	# end
+
+	return tensorFlow
+# end
+
+def estimate_warm(tensorFirst, tensorSecond, tensorPrior, intLevel=4, intBatch=8):
+	# like estimate_batch but starts decoding at intLevel from the [N, 2, H, W] prior flow, for example the flow of the previous pair of a video, and falls back to a full run where this diverges
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+	assert(intLevel in [ 2, 3, 4, 5 ])
+
+	intSamples = tensorFirst.size(0)
+	intWidth = tensorFirst.size(3)
+	intHeight = tensorFirst.size(2)
+
+	intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+	intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+	tensorOutput = torch.FloatTensor(intSamples, 2, intHeight, intWidth)
+
+	for intStart in range(0, intSamples, intBatch):
+		intStop = min(intStart + intBatch, intSamples)
+
+		tensorPreprocessedFirst = torch.nn.functional.interpolate(input=tensorFirst[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+		tensorPreprocessedSecond = torch.nn.functional.interpolate(input=tensorSecond[intStart:intStop, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow = warm_decode(tensorPreprocessedFirst, tensorPreprocessedSecond, moduleNetwork.moduleExtractor(tensorPreprocessedFirst), moduleNetwork.moduleExtractor(tensorPreprocessedSecond), estimate_stack(tensorPrior[intStart:intStop]), intLevel)
+
+		tensorFlow = 20.0 * torch.nn.functional.interpolate(input=tensorFlow, size=(intHeight, intWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
+		tensorFlow[:, 1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+
+		tensorOutput[intStart:intStop, :, :, :].copy_(tensorFlow)
+	# end
+
+	return tensorOutput
+# end
+
+class FlowStream():
+	# flow between consecutive frames of a video, each frame only runs through the extractor once and its pyramid is kept in a ring buffer until the next frame arrives
+
+	def __init__(self, intCapacity=2, intWarm=None):
+		# intWarm is the level at which decoding starts from the flow of the previous pair, or None to always decode from scratch
+
+		assert(intCapacity >= 2)
+		assert(intWarm in [ None, 2, 3, 4, 5 ])
+
+		self.intWarm = intWarm
+		self.objectPyramids = collections.deque(maxlen=intCapacity)
+		self.tensorPrevious = None
+		self.tensorFlow = None
+		self.objectBuffers = collections.defaultdict(dict)
+		self.intHeight = None
+		self.intWidth = None
+		self.objectStats = { 'intFrames': 0, 'intPairs': 0 }
+	# end
+
+	def reset(self):
+		# to be called on scene cuts, the next frame then starts a new sequence
+
+		self.objectPyramids.clear()
+
+		self.tensorPrevious = None
+		self.tensorFlow = None
+	# end
+
+	def push(self, tensorFrame):
+		# tensorFrame is a [3, H, W] tensor / numpy array that has been prepared like in __main__, returns the [2, H, W] flow from the previous frame to this one or None if there is no previous frame
+
+		tensorFrame = estimate_stack([ tensorFrame ])
+
+		intHeight = tensorFrame.size(2)
+		intWidth = tensorFrame.size(3)
+
+		if intHeight != self.intHeight or intWidth != self.intWidth:
+			self.reset()
+
+			self.intHeight = intHeight
+			self.intWidth = intWidth
+		# end
+
+		intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+		intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+		tensorPreprocessed = torch.nn.functional.interpolate(input=tensorFrame.to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+
+		tensorPyramid = moduleNetwork.moduleExtractor(tensorPreprocessed)
+
+		if arguments_strRelease == 'early':
+			tensorPyramid[0] = None # the first level of the pyramid is not used by any of the decoders
+		# end
+
+		self.objectPyramids.append(tensorPyramid)
+		self.objectStats['intFrames'] += 1
+
+		tensorPrevious = self.tensorPrevious
+
+		self.tensorPrevious = tensorPreprocessed if self.intWarm is not None else None # the warm start needs the frames for its photometric check
+
+		if len(self.objectPyramids) < 2:
+			return None
+		# end
+
+		self.objectStats['intPairs'] += 1
+
+		if self.intWarm is None or self.tensorFlow is None:
+			tensorFlow = moduleNetwork.decode(self.objectPyramids[-2], self.objectPyramids[-1], self.objectBuffers)
+
+		elif self.intWarm is not None and self.tensorFlow is not None:
+			tensorFlow = warm_decode(tensorPrevious, tensorPreprocessed, self.objectPyramids[-2], self.objectPyramids[-1], self.tensorFlow, self.intWarm, self.objectBuffers)
+
+		# end
+
+		tensorFlow = 20.0 * torch.nn.functional.interpolate(input=tensorFlow, size=(intHeight, intWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
+		tensorFlow[:, 1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+
+		self.tensorFlow = tensorFlow if self.intWarm is not None else None
+
+		return tensorFlow[0, :, :, :].cpu()
+	# end
+# end
+
+Pairs_objectStats = { 'intPairs': 0, 'intExtracted': 0, 'intEvicted': 0 }
+
+def pairs_plan(objectPairs):
+	# decoding order of the pairs, sweeping through the frames such that the pyramids that are needed by consecutive batches overlap as much as possible - frames that are part of many pairs, like a fixed reference, remain recently used and hence stay cached
+
+	return sorted(range(len(objectPairs)), key=lambda intPair: (max(objectPairs[intPair]), min(objectPairs[intPair]), objectPairs[intPair][0]))
+# end
+
+def estimate_pairs(objectFrames, objectPairs, intBatch=8, intCapacity=16):
+	# flow for arbitrary (i, j) pairs over a set of frames, returned as [len(objectPairs), 2, H, W] in the order of objectPairs - the pyramid of each frame is extracted once as long as it is not evicted from the cache, which holds at most intCapacity pyramids in addition to those of the current batch
+
+	tensorFrames = estimate_stack(objectFrames)
+
+	intWidth = tensorFrames.size(3)
+	intHeight = tensorFrames.size(2)
+
+	intPreprocessedWidth = int(math.floor(math.ceil(intWidth / 64.0) * 64.0))
+	intPreprocessedHeight = int(math.floor(math.ceil(intHeight / 64.0) * 64.0))
+
+	objectOrder = pairs_plan(objectPairs)
+	objectRemaining = collections.Counter([ intFrame for intFirst, intSecond in objectPairs for intFrame in set([ intFirst, intSecond ]) ])
+	objectPyramids = collections.OrderedDict() # least recently used pyramids, keyed by the index of the frame
+	objectBuffers = collections.defaultdict(dict)
+
+	tensorOutput = torch.FloatTensor(len(objectPairs), 2, intHeight, intWidth)
+
+	for intStart in range(0, len(objectOrder), intBatch):
+		objectBatch = objectOrder[intStart:intStart + intBatch]
+		objectMissing = sorted(set([ intFrame for intPair in objectBatch for intFrame in objectPairs[intPair] ]) - set(objectPyramids.keys()))
+
+		if len(objectMissing) > 0:
+			tensorPreprocessed = torch.nn.functional.interpolate(input=tensorFrames[objectMissing, :, :, :].to(arguments_strDevice), size=(intPreprocessedHeight, intPreprocessedWidth), mode='bilinear', align_corners=False)
+
+			tensorPyramid = moduleNetwork.moduleExtractor(tensorPreprocessed)
+
+			if arguments_strRelease == 'early':
+				tensorPyramid[0] = None # the first level of the pyramid is not used by any of the decoders
+			# end
+
+			for intMissing, intFrame in enumerate(objectMissing):
+				objectPyramids[intFrame] = [ tensorLevel[intMissing:intMissing + 1, :, :, :].clone() if tensorLevel is not None else None for tensorLevel in tensorPyramid ] # cloned such that evicting a frame actually frees its memory
+			# end
+
+			Pairs_objectStats['intExtracted'] += len(objectMissing)
+		# end
+
+		for intPair in objectBatch:
+			for intFrame in objectPairs[intPair]:
+				objectPyramids.move_to_end(intFrame)
+			# end
+		# end
+
+		def gather(intSide):
+			return [ torch.cat([ objectPyramids[objectPairs[intPair][intSide]][intLevel] for intPair in objectBatch ], 0) if objectPyramids[objectPairs[objectBatch[0]][intSide]][intLevel] is not None else None for intLevel in range(6) ]
+		# end
+
+		tensorFlow = moduleNetwork.decode(gather(0), gather(1), objectBuffers)
+
+		tensorFlow = 20.0 * torch.nn.functional.interpolate(input=tensorFlow, size=(intHeight, intWidth), mode='bilinear', align_corners=False)
+
+		tensorFlow[:, 0, :, :] *= float(intWidth) / float(intPreprocessedWidth)
+		tensorFlow[:, 1, :, :] *= float(intHeight) / float(intPreprocessedHeight)
+
+		tensorOutput[objectBatch, :, :, :] = tensorFlow.cpu()
+
+		Pairs_objectStats['intPairs'] += len(objectBatch)
+
+		for intPair in objectBatch:
+			for intFrame in set(objectPairs[intPair]):
+				objectRemaining[intFrame] -= 1
+
+				if objectRemaining[intFrame] == 0:
+					del objectPyramids[intFrame] # no longer needed by any of the remaining pairs
+				# end
+			# end
+		# end
+
+		while len(objectPyramids) > intCapacity:
+			objectPyramids.popitem(last=False)
+
+			Pairs_objectStats['intEvicted'] += 1
+		# end
+	# end
+
+	return tensorOutput
+# end
+
+def tiled_weight(intStart, intSize, intTotal, intOverlap):
+	# feathering along one axis, the weight ramps up over the overlap at tile borders that are inside of the image while borders of the image itself are not attenuated
+
+	tensorPosition = torch.arange(intSize, dtype=torch.float32) + 0.5
+	tensorWeight = torch.ones(intSize)
+
+	if intStart > 0:
+		tensorWeight = torch.min(tensorWeight, tensorPosition / intOverlap)
+	# end
+
+	if intStart + intSize < intTotal:
+		tensorWeight = torch.min(tensorWeight, (intSize - tensorPosition) / intOverlap)
+	# end
+
+	return tensorWeight.clamp(min=0.001)
+# end
+
+def tiled_starts(intTile, intOverlap, intTotal):
+	if intTile >= intTotal:
+		return [ 0 ]
+	# end
+
+	return sorted(set(list(range(0, intTotal - intTile, intTile - intOverlap)) + [ intTotal - intTile ]))
+# end
+
+def estimate_tiled(tensorFirst, tensorSecond, intTile=1024, intOverlap=256, intBatch=4, moduleEstimate=None, intBudget=None):
+	# splits large frames into overlapping tiles, runs them as batches, and blends the flow of the tiles using feathered weights - the refiner alone sees 33 pixels in each direction at a quarter of the resolution (Roi_intReceptive pixels in the input) and the coarsest level works at 1/64 of the resolution, which is why the overlap should not be much below 256 pixels
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+	assert(intOverlap < intTile)
+
+	intSamples = tensorFirst.size(0)
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	if intHeight <= intTile and intWidth <= intTile:
+		return estimate_batch(tensorFirst, tensorSecond, intBatch, intBudget, moduleEstimate)
+	# end
+
+	intTileHeight = min(intTile, intHeight)
+	intTileWidth = min(intTile, intWidth)
+
+	objectTiles = [ (intY, intX) for intY in tiled_starts(intTileHeight, intOverlap, intHeight) for intX in tiled_starts(intTileWidth, intOverlap, intWidth) ]
+
+	tensorFlow = torch.zeros(intSamples, 2, intHeight, intWidth)
+	tensorNormalize = torch.zeros(1, 1, intHeight, intWidth)
+
+	for intStart in range(0, len(objectTiles), intBatch):
+		objectBatch = objectTiles[intStart:intStart + intBatch]
+
+		tensorTiles = estimate_batch(
+			torch.cat([ tensorFirst[:, :, intY:intY + intTileHeight, intX:intX + intTileWidth] for intY, intX in objectBatch ], 0),
+			torch.cat([ tensorSecond[:, :, intY:intY + intTileHeight, intX:intX + intTileWidth] for intY, intX in objectBatch ], 0),
+			intBatch * intSamples,
+			intBudget, # the number of tiles per forward pass is hence bounded by the memory model as well
+			moduleEstimate
+		)
+
+		for intTile, (intY, intX) in enumerate(objectBatch):
+			tensorWeight = tiled_weight(intY, intTileHeight, intHeight, intOverlap).view(1, 1, -1, 1) * tiled_weight(intX, intTileWidth, intWidth, intOverlap).view(1, 1, 1, -1)
+
+			tensorFlow[:, :, intY:intY + intTileHeight, intX:intX + intTileWidth] += tensorTiles[intTile * intSamples:(intTile + 1) * intSamples, :, :, :] * tensorWeight
+			tensorNormalize[:, :, intY:intY + intTileHeight, intX:intX + intTileWidth] += tensorWeight
+		# end
+	# end
+
+	return tensorFlow.div_(tensorNormalize)
+# end
+
+def upsample_joint(tensorFlow, tensorGuide, tensorGuideLow, intRadius=None, dblSigmaSpace=1.0, dblSigmaColor=0.1, intRows=16):
+	# joint bilateral upsampling, every output pixel is a weighted average of the low resolution flow in a (2 * intRadius + 1)**2 neighborhood where the weights depend on the distance in the low resolution and the difference in the full resolution guide
+	# the neighborhood is gathered once per block of intRows output rows instead of once per offset, and the radius defaults to about four full resolution pixels which keeps the cost proportional to the coarse pass
+
+	intHeight = tensorGuide.size(2)
+	intWidth = tensorGuide.size(3)
+	intHeightLow = tensorFlow.size(2)
+	intWidthLow = tensorFlow.size(3)
+
+	if intRadius is None:
+		intRadius = min(max(int(round(4.0 * float(intHeightLow) / float(intHeight))), 1), 2)
+	# end
+
+	intSize = (2 * intRadius) + 1
+
+	tensorFlow = torch.cat([ tensorFlow[:, 0:1, :, :] * (float(intWidth) / float(intWidthLow)), tensorFlow[:, 1:2, :, :] * (float(intHeight) / float(intHeightLow)) ], 1)
+
+	tensorY = ((torch.arange(intHeight, dtype=torch.float32, device=tensorFlow.device) + 0.5) * (float(intHeightLow) / float(intHeight))) - 0.5
+	tensorX = ((torch.arange(intWidth, dtype=torch.float32, device=tensorFlow.device) + 0.5) * (float(intWidthLow) / float(intWidth))) - 0.5
+
+	tensorOffset = torch.arange(-intRadius, intRadius + 1, dtype=torch.long, device=tensorFlow.device).view(-1, 1)
+
+	tensorIndexY = (tensorY.round().long().view(1, -1) + tensorOffset).clamp(0, intHeightLow - 1) # [ intSize, intHeight ]
+	tensorIndexX = (tensorX.round().long().view(1, -1) + tensorOffset).clamp(0, intWidthLow - 1) # [ intSize, intWidth ]
+
+	tensorSpaceY = (tensorY.view(1, -1) - tensorIndexY.float()).pow(2.0) * (-0.5 / (dblSigmaSpace * dblSigmaSpace))
+	tensorSpaceX = (tensorX.view(1, -1) - tensorIndexX.float()).pow(2.0).view(1, 1, intSize, intWidth) * (-0.5 / (dblSigmaSpace * dblSigmaSpace))
+
+	tensorColumns = torch.cat([ tensorFlow, tensorGuideLow ], 1).index_select(3, tensorIndexX.view(-1)).view(tensorFlow.size(0), 5, intHeightLow, intSize, intWidth) # every low resolution row with the horizontal neighborhood of every output column
+
+	tensorOutput = tensorFlow.new_empty([ tensorFlow.size(0), 2, intHeight, intWidth ])
+
+	for intY in range(0, intHeight, intRows):
+		intStop = min(intY + intRows, intHeight)
+
+		tensorGuideRows = tensorGuide[:, :, intY:intStop, :].unsqueeze(3)
+		tensorNumerator = tensorFlow.new_zeros([ tensorFlow.size(0), 2, intStop - intY, intWidth ])
+		tensorDenominator = tensorFlow.new_zeros([ tensorFlow.size(0), intStop - intY, intWidth ])
+
+		for intOffsetY in range(intSize):
+			tensorNeighbors = tensorColumns.index_select(2, tensorIndexY[intOffsetY, intY:intStop]) # [ N, 2 + 3, rows, intSize, intWidth ]
+
+			tensorColor = tensorNeighbors[:, 2:, :, :, :] - tensorGuideRows
+			tensorColor.mul_(tensorColor)
+
+			tensorWeight = tensorColor[:, 0, :, :, :] + tensorColor[:, 1, :, :, :]
+			tensorWeight += tensorColor[:, 2, :, :, :]
+			tensorWeight.mul_(-0.5 / (dblSigmaColor * dblSigmaColor)).add_(tensorSpaceY[intOffsetY, intY:intStop].view(1, -1, 1, 1)).add_(tensorSpaceX).exp_()
+
+			tensorNumerator += (tensorNeighbors[:, 0:2, :, :, :] * tensorWeight.unsqueeze(1)).sum(3)
+			tensorDenominator += tensorWeight.sum(2)
+		# end
+
+		tensorOutput[:, :, intY:intStop, :] = tensorNumerator / tensorDenominator.clamp(min=0.0000001).unsqueeze(1)
+	# end
+
+	return tensorOutput
+# end
+
+def estimate_cascade(tensorFirst, tensorSecond, dblScale=0.5, intBatch=8, intRadius=None, dblSigmaSpace=1.0, dblSigmaColor=0.1):
+	# runs the network at a reduced resolution and upsamples the flow with an edge-aware joint upsampler that is guided by the full resolution first image
+
+	tensorFirst = estimate_stack(tensorFirst)
+	tensorSecond = estimate_stack(tensorSecond)
+
+	assert(tensorFirst.size() == tensorSecond.size())
+
+	if dblScale == 1.0:
+		return estimate_batch(tensorFirst, tensorSecond, intBatch)
+	# end
+
+	intHeight = tensorFirst.size(2)
+	intWidth = tensorFirst.size(3)
+
+	intHeightLow = max(int(round(intHeight * dblScale)), 1)
+	intWidthLow = max(int(round(intWidth * dblScale)), 1)
+
+	tensorFirstLow = torch.nn.functional.interpolate(input=tensorFirst, size=(intHeightLow, intWidthLow), mode='area')
+	tensorSecondLow = torch.nn.functional.interpolate(input=tensorSecond, size=(intHeightLow, intWidthLow), mode='area')
+
+	tensorFlowLow = estimate_batch(tensorFirstLow, tensorSecondLow, intBatch)
+
+	tensorOutput = torch.FloatTensor(tensorFirst.size(0), 2, intHeight, intWidth)
+
+	for intStart in range(0, tensorFirst.size(0), intBatch):
+		intStop = min(intStart + intBatch, tensorFirst.size(0))
+
+		tensorOutput[intStart:intStop, :, :, :] = upsample_joint(tensorFlowLow[intStart:intStop, :, :, :].to(arguments_strDevice), tensorFirst[intStart:intStop, :, :, :].to(arguments_strDevice), tensorFirstLow[intStart:intStop, :, :, :].to(arguments_strDevice), intRadius, dblSigmaSpace, dblSigmaColor)
+	# end
+
+	return tensorOutput
+# end
+
+def benchmark_cascade(tensorFirst=None, tensorSecond=None, dblScales=[ 1.0, 0.75, 0.5, 0.25 ]):
+	# accuracy / speed curve of the cascade against running the network at the full resolution, including plain bilinear upsampling for reference
+
+	if tensorFirst is None:
+		tensorFirst = read_image(arguments_strFirst).unsqueeze(0)
+		tensorSecond = read_image(arguments_strSecond).unsqueeze(0)
+	# end
+
+	estimate_batch(tensorFirst, tensorSecond, intBudget=0) # warmup, which also runs the autotuner of the correlation
+
+	dblStart = time.time()
+	tensorReference = estimate_batch(tensorFirst, tensorSecond, intBudget=0)
+	dblReference = time.time() - dblStart
+
+	objectReport = {}
+
+	for dblScale in dblScales:
+		estimate_cascade(tensorFirst, tensorSecond, dblScale) # warmup, which also runs the autotuner of the correlation
+
+		dblStart = time.time()
+		tensorCascade = estimate_cascade(tensorFirst, tensorSecond, dblScale)
+		dblTime = time.time() - dblStart
+
+		intHeightLow = max(int(round(tensorFirst.size(2) * dblScale)), 1)
+		intWidthLow = max(int(round(tensorFirst.size(3) * dblScale)), 1)
+
+		tensorFirstLow = torch.nn.functional.interpolate(input=tensorFirst, size=(intHeightLow, intWidthLow), mode='area')
+		tensorSecondLow = torch.nn.functional.interpolate(input=tensorSecond, size=(intHeightLow, intWidthLow), mode='area')
+
+		dblStart = time.time()
+		tensorLow = estimate_batch(tensorFirstLow, tensorSecondLow, intBudget=0)
+		dblCoarse = time.time() - dblStart
+
+		dblStart = time.time()
+		if dblScale != 1.0:
+			upsample_joint(tensorLow.to(arguments_strDevice), tensorFirst.to(arguments_strDevice), tensorFirstLow.to(arguments_strDevice))
+		# end
+		dblUpsample = time.time() - dblStart
+
+		tensorBilinear = torch.nn.functional.interpolate(input=tensorLow, size=(tensorFirst.size(2), tensorFirst.size(3)), mode='bilinear', align_corners=False)
+		tensorBilinear[:, 0, :, :] *= float(tensorFirst.size(3)) / float(intWidthLow)
+		tensorBilinear[:, 1, :, :] *= float(tensorFirst.size(2)) / float(intHeightLow)
+
+		objectReport[dblScale] = { 'dblTime': dblTime, 'dblSpeedup': dblReference / dblTime, 'dblCoarse': dblCoarse, 'dblUpsample': dblUpsample, 'dblShare': dblUpsample / (dblCoarse + dblUpsample), 'dblEpe': flow_epe(tensorCascade, tensorReference), 'dblBilinear': flow_epe(tensorBilinear, tensorReference) }
+
+		print('scale {:.2f}: {:.3f} seconds ({:.2f}x), {:.3f} seconds of which are upsampling ({:.0f}%), {:.4f} epe with joint upsampling, {:.4f} epe with bilinear upsampling'.format(dblScale, dblTime, objectReport[dblScale]['dblSpeedup'], dblUpsample, 100.0 * objectReport[dblScale]['dblShare'], objectReport[dblScale]['dblEpe'], objectReport[dblScale]['dblBilinear']))
+	# end
+
+	return objectReport
+# end
+
+def flow_epe(tensorFirst, tensorSecond):
+	# average endpoint error between two flow fields of size [N, 2, H, W] or [2, H, W]
+
+	return (tensorFirst - tensorSecond).pow(2.0).sum(-3).sqrt().mean().item()
+# end
+
+def benchmark_tiled(tensorFirst=None, tensorSecond=None, intTiles=[ 256, 512, 1024 ], intOverlaps=[ 64, 128, 256 ]):
+	# compares the tiled estimate against the estimate on the full frame, by default on the provided sample images
+
+	if tensorFirst is None:
+		tensorFirst = read_image(arguments_strFirst).unsqueeze(0)
+		tensorSecond = read_image(arguments_strSecond).unsqueeze(0)
+	# end
+
+	tensorFull = estimate_batch(tensorFirst, tensorSecond, intBudget=0)
+
+	objectReport = {}
+
+	for intTile in intTiles:
+		for intOverlap in intOverlaps:
+			if intOverlap >= intTile:
+				continue
+			# end
+
+			dblStart = time.time()
+			tensorTiled = estimate_tiled(tensorFirst, tensorSecond, intTile, intOverlap)
+			dblTime = time.time() - dblStart
+
+			objectReport[(intTile, intOverlap)] = { 'dblEpe': flow_epe(tensorTiled, tensorFull), 'dblTime': dblTime }
+
+			print('tile {:d}, overlap {:d}: {:.4f} epe against the full frame, {:.2f} seconds'.format(intTile, intOverlap, objectReport[(intTile, intOverlap)]['dblEpe'], dblTime))
+		# end
+	# end
+
+	return objectReport
+# end
+
+def benchmark_gate(tensorFirst=None, tensorSecond=None, dblThresholds=[ 0.3, 0.5, 0.7 ]):
+	# reports the latency that is saved and the deviation from always running the refiner for the different gating policies
+
+	global arguments_strGate, arguments_dblGate
+
+	if tensorFirst is None:
+		tensorFirst = read_image(arguments_strFirst).unsqueeze(0)
+		tensorSecond = read_image(arguments_strSecond).unsqueeze(0)
+	# end
+
+	strGate, dblGate = arguments_strGate, arguments_dblGate
+
+	arguments_strGate = 'none'
+
+	estimate_batch(tensorFirst, tensorSecond, intBudget=0) # warmup, which also runs the autotuner of the correlation
+
+	dblStart = time.time()
+	tensorReference = estimate_batch(tensorFirst, tensorSecond, intBudget=0)
+	dblReference = time.time() - dblStart
+
+	objectReport = {}
+
+	for arguments_strGate in [ 'pair', 'tile' ]:
+		for arguments_dblGate in dblThresholds:
+			Gate_objectStats['intUnits'] = 0
+			Gate_objectStats['intRefined'] = 0
+
+			dblStart = time.time()
+			tensorGated = estimate_batch(tensorFirst, tensorSecond, intBudget=0)
+			dblTime = time.time() - dblStart
+
+			objectReport[(arguments_strGate, arguments_dblGate)] = { 'dblSaved': dblReference - dblTime, 'dblEpe': flow_epe(tensorGated, tensorReference), 'dblRefined': float(Gate_objectStats['intRefined']) / max(Gate_objectStats['intUnits'], 1) }
+
+			print('{:s} gate at {:.2f}: {:.1f}% refined, {:.3f} of {:.3f} seconds saved, {:.4f} epe against always refining'.format(arguments_strGate, arguments_dblGate, 100.0 * objectReport[(arguments_strGate, arguments_dblGate)]['dblRefined'], dblReference - dblTime, dblReference, objectReport[(arguments_strGate, arguments_dblGate)]['dblEpe']))
+		# end
+	# end
+
+	arguments_strGate, arguments_dblGate = strGate, dblGate
+
+	return objectReport
+# end
+
+def benchmark_precision(tensorFirst=None, tensorSecond=None, strPrecisions=[ 'bfloat16', 'float16', 'int8' ], dblTolerance=None):
+	# compares the reduced precisions against single precision, a precision is only accepted if its average endpoint error stays below the tolerance
+
+	if tensorFirst is None:
+		tensorFirst = read_image(arguments_strFirst).unsqueeze(0)
+		tensorSecond = read_image(arguments_strSecond).unsqueeze(0)
+	# end
+
+	if dblTolerance is None:
+		dblTolerance = Precision_dblTolerance
+	# end
+
+	objectReport = {}
+
+	for strPrecision in [ 'float32' ] + strPrecisions:
+		try:
+			if strPrecision == 'int8':
+				moduleEstimate = quantize_load()
+
+			elif strPrecision != 'int8':
+				moduleEstimate = Network().to(arguments_strDevice, Precision_objectTypes[strPrecision]).eval()
+
+			# end
+
+			estimate_batch(tensorFirst, tensorSecond, intBudget=0, moduleEstimate=moduleEstimate) # warmup, which also runs the autotuner of the correlation
+
+			dblStart = time.time()
+			tensorFlow = estimate_batch(tensorFirst, tensorSecond, intBudget=0, moduleEstimate=moduleEstimate)
+			dblTime = time.time() - dblStart
+		except Exception as objectError:
+			print('{:s}: not supported, {:s}'.format(strPrecision, str(objectError)))
+
+			continue
+		# end
+
+		if strPrecision == 'float32':
+			tensorReference, dblReference = tensorFlow, dblTime
+		# end
+
+		objectReport[strPrecision] = { 'dblEpe': flow_epe(tensorFlow, tensorReference), 'dblTime': dblTime, 'boolAccepted': flow_epe(tensorFlow, tensorReference) < dblTolerance }
+
+		print('{:s}: {:.4f} epe against float32, {:.3f} of {:.3f} seconds, {:s}'.format(strPrecision, objectReport[strPrecision]['dblEpe'], dblTime, dblReference, 'accepted' if objectReport[strPrecision]['boolAccepted'] == True else 'rejected'))
+	# end
+
+	return objectReport
+# end
+
+def benchmark_backend(tensorFirst=None, tensorSecond=None, strBackends=[ 'script', 'onnx' ]):
+	# runs the other backends side by side with the eager network and reports their deviation and latency
+
+	if tensorFirst is None:
+		tensorFirst = read_image(arguments_strFirst).unsqueeze(0)
+		tensorSecond = read_image(arguments_strSecond).unsqueeze(0)
+	# end
+
+	objectReport = {}
+
+	for strBackend in [ 'eager' ] + strBackends:
+		moduleEstimate = { 'eager': lambda: moduleNetwork, 'script': lambda: static_load(), 'compile': lambda: torch.compile(NetworkStatic(moduleNetwork).eval()), 'onnx': lambda: OnnxBackend(moduleNetwork) }[strBackend]()
+
+		estimate_batch(tensorFirst, tensorSecond, intBudget=0, moduleEstimate=moduleEstimate) # warmup, which also exports / compiles the model
+
+		dblStart = time.time()
+		tensorFlow = estimate_batch(tensorFirst, tensorSecond, intBudget=0, moduleEstimate=moduleEstimate)
+		dblTime = time.time() - dblStart
+
+		if strBackend == 'eager':
+			tensorReference, dblReference = tensorFlow, dblTime
+		# end
+
+		objectReport[strBackend] = { 'dblEpe': flow_epe(tensorFlow, tensorReference), 'dblTime': dblTime }
+
+		print('{:s}: {:.4f} epe against eager, {:.3f} of {:.3f} seconds'.format(strBackend, objectReport[strBackend]['dblEpe'], dblTime, dblReference))
+	# end
+
+	return objectReport
+# end
+
+def layout_report(tensorFirst=None, tensorSecond=None):
+	# runs the eager network and counts, for every convolution as well as for the correlation and the warping, the inputs and outputs that are not in the layout selected through arguments_strLayout and hence imply a conversion
+
+	global Backward
+
+	if tensorFirst is None:
+		tensorFirst = read_image(arguments_strFirst).unsqueeze(0)
+		tensorSecond = read_image(arguments_strSecond).unsqueeze(0)
+	# end
+
+	objectFormat = { 'nchw': torch.contiguous_format, 'nhwc': torch.channels_last }[arguments_strLayout]
+
+	objectReport = collections.OrderedDict()
+
+	def check(strName, tensorInputs, tensorOutput):
+		if strName not in objectReport:
+			objectReport[strName] = { 'intCalls': 0, 'intConversions': 0 }
+		# end
+
+		objectReport[strName]['intCalls'] += 1
+		objectReport[strName]['intConversions'] += sum([ 1 for tensorInput in tensorInputs + [ tensorOutput ] if tensorInput.is_contiguous(memory_format=objectFormat) == False ])
+	# end
+
+	def wrap(strName, functionOriginal):
+		def function(tensorFirst, tensorSecond, objectBuffers=None):
+			tensorOutput = functionOriginal(tensorFirst, tensorSecond, objectBuffers)
+
+			check(strName, [ tensorFirst, tensorSecond ], tensorOutput)
+
+			return tensorOutput
+		# end
+
+		return function
+	# end
+
+	def warp(tensorInput, tensorFlow):
+		tensorOutput = functionBackward(tensorInput, tensorFlow)
+
+		check('backward', [ tensorInput, tensorFlow ], tensorOutput)
+
+		return tensorOutput
+	# end
+
+	objectHooks = [ moduleLayer.register_forward_hook(lambda moduleLayer, tensorInputs, tensorOutput, strName=strName: check(strName, list(tensorInputs), tensorOutput)) for strName, moduleLayer in moduleNetwork.named_modules() if isinstance(moduleLayer, (torch.nn.Conv2d, torch.nn.ConvTranspose2d, QuantizedConvolution)) == True ]
+
+	moduleDecoders = [ moduleNetwork.moduleTwo, moduleNetwork.moduleThr, moduleNetwork.moduleFou, moduleNetwork.moduleFiv, moduleNetwork.moduleSix ]
+
+	for moduleDecoder, strDecoder in zip(moduleDecoders, [ 'moduleTwo', 'moduleThr', 'moduleFou', 'moduleFiv', 'moduleSix' ]):
+		moduleDecoder.functionCorrelation = wrap(strDecoder + '.correlation', moduleDecoder.functionCorrelation)
+	# end
+
+	functionBackward = Backward
+
+	Backward = warp
+
+	try:
+		estimate_batch(tensorFirst, tensorSecond, intBudget=0, moduleEstimate=moduleNetwork)
+
+	finally:
+		Backward = functionBackward
+
+		for moduleDecoder in moduleDecoders:
+			moduleDecoder.functionCorrelation = { 81: correlation.FunctionCorrelation, 9: correlation.FunctionCorrelationHorizontal }[moduleDecoder.intVolume]
+		# end
+
+		for objectHook in objectHooks:
+			objectHook.remove()
+		# end
+
+	# end
+
+	for strName, objectLayer in objectReport.items():
+		print('{:s}: {:d} conversions in {:d} calls'.format(strName, objectLayer['intConversions'], objectLayer['intCalls']))
+	# end
+
+	print('{:d} conversions in total'.format(sum([ objectLayer['intConversions'] for objectLayer in objectReport.values() ])))
+
+	return objectReport
 # end
 
 ##########################################################
 
 if __name__ == '__main__':
-	tensorFirst = torch.FloatTensor(numpy.array(PIL.Image.open(arguments_strFirst))[:, :, ::-1].transpose(2, 0, 1).astype(numpy.float32) * (1.0 / 255.0))
-	tensorSecond = torch.FloatTensor(numpy.array(PIL.Image.open(arguments_strSecond))[:, :, ::-1].transpose(2, 0, 1).astype(numpy.float32) * (1.0 / 255.0))
+	tensorFirst = read_image(arguments_strFirst)
+	tensorSecond = read_image(arguments_strSecond)
 
 	tensorOutput = estimate(tensorFirst, tensorSecond)
 